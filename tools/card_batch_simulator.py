@@ -0,0 +1,441 @@
+"""
+Citadel Batched Game Simulator
+================================
+card_simulator.py 的 NumPy 批量版: K 局对局同步推进 (lockstep)。
+
+状态按"结构数组"存放: S[side, stat] 是一个长度为 K 的向量 (side 0 = 玩家,
+1 = 敌人，stat 顺序与 INITIAL_STATE 一致)。每一步所有未结束的对局同时进行
+一个回合；卡牌效果复用 card_simulator.card_program 给出的 op (IR 条目直接取预编译的 ops)，
+常见 op 展开为 (卡牌 × 槽位) 参数表，同一槽位上所有对局的 op 以带掩码的
+向量运算一次完成 (包括 dealDmgToOpp 的先扣墙、溢出扣塔)。
+某局结束后，其槽位立即开始新的一局，直到凑满 count 局。
+
+规则与 card_simulator.run_simulation 完全一致，但随机数流不同，
+因此两者的统计结果一致而逐局结果不同。
+
+用法:
+  python tools/card_batch_simulator.py 100000 --batch 8192 --seed 42
+  python tools/card_batch_simulator.py 100000 --ir tools/card_ir.json
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from card_simulator import (
+    INITIAL_STATE, STATS, COLOR_RESOURCE, WIN_TOWER, HAND_SIZE, MAX_TURNS,
+    TOWER, WALL, QUARRIES, BRICKS, MAGIC, GEMS, DUNGEON, BEASTS,
+    card_program, new_tally, load_cards, print_tally, print_card_plays,
+)
+
+_STAT = {name: i for i, name in enumerate(STATS)}
+_SIDE = {'self': 0, 'opp': 1}
+_CMP = {'<': np.less, '>': np.greater, '==': np.equal}
+_UNPLAYABLE = np.iinfo(np.int64).max // 2     # 颜色未知的卡: 费用视为无穷大
+
+
+# ─── 向量化 op 执行 ────────────────────────────────────────────────────────────
+# F 是状态数组 S (形状 side × stat × K) 的一维视图，S[side, stat, g] 对应
+# F[side * len(STATS) * K + stat * K + g]。op 以两组偏移量执行:
+#   sides = (出牌方偏移, 对方偏移)，即各对局 stat 为 0 时在 F 中的位置；
+#   stride = K，stat 为 i 时再加 i * K。
+# 同一 op 涉及的 (side, 对局) 两两不同，因此可以直接用花式索引读写。
+
+def _apply_ops(F, ops, sides, stride):
+    for op in ops:
+        if sides[0].size:
+            _apply_op(F, op, sides, stride)
+
+
+def _apply_op(F, op, sides, stride):
+    kind = op[0]
+    me, opp = sides
+
+    if kind == 'damage':
+        base, n = sides[_SIDE[op[1]]], op[2]
+        w, t = base + WALL * stride, base + TOWER * stride
+        wall, tower = F[w], F[t]
+        excess = n - wall
+        over = excess > 0
+        F[w] = np.where(over, 0, wall - n)
+        F[t] = np.where(over, np.maximum(0, tower - excess), tower)
+
+    elif kind == 'tower_damage' or kind == 'wall_damage':
+        i = TOWER if kind == 'tower_damage' else WALL
+        idx = sides[_SIDE[op[1]]] + i * stride
+        F[idx] = np.maximum(0, F[idx] - op[2])
+
+    elif kind == 'gain':
+        F[sides[_SIDE[op[1]]] + _STAT[op[2]] * stride] += op[3]
+
+    elif kind == 'lose':
+        idx = sides[_SIDE[op[1]]] + _STAT[op[2]] * stride
+        F[idx] = np.maximum(op[4], F[idx] - op[3])
+
+    elif kind == 'raise_to_enemy':
+        off = _STAT[op[1]] * stride
+        F[me + off] = np.maximum(F[me + off], F[opp + off])
+
+    elif kind == 'equalize_max':
+        off = _STAT[op[1]] * stride
+        high = np.maximum(F[me + off], F[opp + off])
+        F[me + off] = high
+        F[opp + off] = high
+
+    elif kind == 'swap':
+        off = _STAT[op[1]] * stride
+        mine = F[me + off]
+        F[me + off] = F[opp + off]
+        F[opp + off] = mine
+
+    elif kind == 'steal_half':
+        off, n = _STAT[op[1]] * stride, op[2]
+        theirs = F[opp + off]
+        taken = np.minimum(n, theirs)
+        F[opp + off] = np.maximum(0, theirs - n)
+        F[me + off] += (taken + 1) // 2     # 非负整数的向上取整
+
+    elif kind == 'if':
+        (side, stat), cmp, rhs = op[1]
+        lhs = F[sides[_SIDE[side]] + _STAT[stat] * stride]
+        if not isinstance(rhs, int):
+            rhs = F[sides[_SIDE[rhs[0]]] + _STAT[rhs[1]] * stride]
+        hit = _CMP[cmp](lhs, rhs)
+        miss = ~hit
+        _apply_ops(F, op[2], (me[hit], opp[hit]), stride)
+        _apply_ops(F, op[3], (me[miss], opp[miss]), stride)
+
+    else:
+        raise ValueError(f"unknown op: {op!r}")
+
+
+# ─── op 表 ────────────────────────────────────────────────────────────────────
+# 常见 op 降为参数表，同一步里不同卡的同一槽位 op 可以一次向量运算完成:
+#   OP_ADD    : F[i] = max(floor, F[i] + delta)   (gain / lose / tower_damage / wall_damage)
+#   OP_DAMAGE : 先扣墙、溢出扣塔                     (damage)
+#   OP_SPECIAL: 其余 op，按卡分组交给 _apply_op
+# 两个分支都只有一个 ADD / DAMAGE op 的 'if' 也会展开: 主表存 then 分支，
+# else 表存 else 分支，条件表存比较的两侧，执行时按条件逐局选择参数。
+OP_NONE, OP_ADD, OP_DAMAGE, OP_SPECIAL = -1, 0, 1, 2
+_NO_FLOOR = np.iinfo(np.int64).min
+_CMP_CODE = {'<': 0, '>': 1, '==': 2}
+
+
+def _lower(op):
+    """返回 (类型, side, stat, delta, floor)。"""
+    kind = op[0]
+    if kind == 'gain':
+        return OP_ADD, _SIDE[op[1]], _STAT[op[2]], op[3], _NO_FLOOR
+    if kind == 'lose':
+        return OP_ADD, _SIDE[op[1]], _STAT[op[2]], -op[3], op[4]
+    if kind == 'tower_damage':
+        return OP_ADD, _SIDE[op[1]], TOWER, -op[2], 0
+    if kind == 'wall_damage':
+        return OP_ADD, _SIDE[op[1]], WALL, -op[2], 0
+    if kind == 'damage':
+        return OP_DAMAGE, _SIDE[op[1]], WALL, op[2], 0
+    return OP_SPECIAL, 0, 0, 0, 0
+
+
+def _lower_if(op):
+    """可展开的 'if' 返回 (条件参数, then 参数, else 参数)，否则返回 None。"""
+    if op[0] != 'if' or len(op[2]) != 1 or len(op[3]) != 1:
+        return None
+    then, other = _lower(op[2][0]), _lower(op[3][0])
+    if OP_SPECIAL in (then[0], other[0]):
+        return None
+    (side, stat), cmp, rhs = op[1]
+    if isinstance(rhs, int):
+        right = (-1, 0, rhs)
+    else:
+        right = (_SIDE[rhs[0]], _STAT[rhs[1]], 0)
+    return (_SIDE[side], _STAT[stat], _CMP_CODE[cmp]) + right, then, other
+
+
+class _OpTables:
+    """把每张卡的 op 列表展开为 (卡牌 × 槽位) 的参数表。"""
+
+    def __init__(self, programs):
+        self.width = max([len(ops) for ops in programs] + [1])
+        shape = (len(programs), self.width)
+
+        def table(fill=0):
+            return np.full(shape, fill, dtype=np.int64)
+
+        self.n_ops = np.array([len(ops) for ops in programs])
+        # 主表 (普通 op / 'if' 的 then 分支) 与 else 分支表，末维为 kind, side, stat, delta, floor
+        blank = (OP_NONE, 0, 0, 0, _NO_FLOOR)
+        self.main = np.tile(np.array(blank, dtype=np.int64), shape + (1,))
+        self.other = self.main.copy()
+        # 条件表: 左侧 side/stat, 比较符, 右侧 side (-1 为常数)/stat/常数
+        self.is_if = np.zeros(shape, dtype=bool)
+        self.cond = [table() for _ in range(6)]
+        for c, ops in enumerate(programs):
+            for j, op in enumerate(ops):
+                lowered = _lower_if(op)
+                if lowered:
+                    self.is_if[c, j] = True
+                    cond, then, other = lowered
+                    for t, v in zip(self.cond, cond):
+                        t[c, j] = v
+                    self.other[c, j] = other
+                else:
+                    then = _lower(op)
+                self.main[c, j] = then
+
+
+# ─── 批量对局 ──────────────────────────────────────────────────────────────────
+class BatchSimulator:
+    """K 个对局槽位的同步模拟器。"""
+
+    def __init__(self, cards: list, batch: int, rng: np.random.Generator):
+        self.n_cards = len(cards)
+        self.deck_size = 2 * self.n_cards
+        self.K = batch
+        self.rng = rng
+
+        programs = [card_program(c) for c in cards]
+        self.ops = [ops for ops, _ in programs]
+        self.tables = _OpTables(self.ops)
+        self.play_again = np.array([again for _, again in programs])
+        self.pay = np.array([_STAT[COLOR_RESOURCE[c['color']]] if c.get('color') in COLOR_RESOURCE
+                             else 0 for c in cards])
+        self.cost = np.array([c.get('cost', 0) if c.get('color') in COLOR_RESOURCE
+                              else _UNPLAYABLE for c in cards], dtype=np.int64)
+        self.pay_offset = self.pay * batch                 # 支付资源在 F 中相对 stat 0 的偏移
+        self._initial = np.array([INITIAL_STATE[k] for k in STATS], dtype=np.int64)
+
+        K = batch
+        self.S = np.zeros((2, len(STATS), K), dtype=np.int64)
+        self.hands = np.zeros((2, K, HAND_SIZE), dtype=np.int64)
+        self.decks = np.zeros((K, self.deck_size), dtype=np.int64)
+        self.deck_pos = np.zeros(K, dtype=np.int64)
+        self.active = np.zeros(K, dtype=np.int64)          # 当前出牌方
+        self.turns = np.zeros(K, dtype=np.int64)
+        self.dead_hands = np.zeros(K, dtype=np.int64)
+        self.plays = np.zeros((K, 2, self.n_cards), dtype=np.int64)
+        self.live = np.zeros(K, dtype=bool)
+
+    def _shuffle(self, g):
+        base = np.tile(np.arange(self.n_cards, dtype=np.int64), 2)
+        self.decks[g] = self.rng.permuted(np.broadcast_to(base, (g.size, self.deck_size)), axis=1)
+        self.deck_pos[g] = 0
+
+    def _draw(self, g):
+        empty = g[self.deck_pos[g] >= self.deck_size]
+        if empty.size:
+            self._shuffle(empty)
+        cards = self.decks[g, self.deck_pos[g]]
+        self.deck_pos[g] += 1
+        return cards
+
+    def start(self, g):
+        """在槽位 g 上开新局: 重置状态、洗牌并轮流发 6 张手牌。"""
+        self.S[:, :, g] = self._initial[None, :, None]
+        self._shuffle(g)
+        for j in range(HAND_SIZE):
+            self.hands[0, g, j] = self._draw(g)
+            self.hands[1, g, j] = self._draw(g)
+        self.active[g] = 0
+        self.turns[g] = 0
+        self.dead_hands[g] = 0
+        self.plays[g] = 0
+        self.live[g] = True
+
+    def step(self):
+        """所有进行中的对局各推进一个回合，返回本回合结束的对局槽位。"""
+        K, F = self.K, self.S.reshape(-1)
+        g = np.flatnonzero(self.live)
+        a = self.active[g]
+        me = a * (len(STATS) * K) + g                      # 出牌方 stat 0 的偏移
+        opp = (1 - a) * (len(STATS) * K) + g
+
+        self.turns[g] += 1
+        if (self.turns[g] > MAX_TURNS).any():
+            raise RuntimeError('Game loop infinite')
+
+        # 资源产出
+        F[me + BRICKS * K] += F[me + QUARRIES * K]
+        F[me + GEMS * K] += F[me + MAGIC * K]
+        F[me + BEASTS * K] += F[me + DUNGEON * K]
+
+        # 找出手牌中第一张付得起的卡 (canAfford)；从右往左扫描，最后留下最左边的一张
+        hands = self.hands.reshape(2 * K, HAND_SIZE)
+        rows = a * K + g
+        hand = hands[rows]
+        pos = np.full(g.size, HAND_SIZE)
+        for j in range(HAND_SIZE - 1, -1, -1):
+            c = hand[:, j]
+            pos = np.where(F[me + self.pay_offset[c]] >= self.cost[c], j, pos)
+        can = pos < HAND_SIZE
+        pos[~can] = 0                                      # 无牌可出: 弃掉第一张
+        card = hand[np.arange(g.size), pos]
+        self.dead_hands[g[~can]] += 1
+
+        # 支付费用并执行效果
+        pc, pme, popp = card[can], me[can], opp[can]
+        F[pme + self.pay_offset[pc]] -= self.cost[pc]
+        self.plays.reshape(-1)[(g[can] * 2 + a[can]) * self.n_cards + pc] += 1
+        self._run_programs(F, pc, pme, popp)
+
+        # 移除打出/弃掉的牌，后面的牌左移，末尾补一张新牌
+        shifted = np.empty_like(hand)
+        for j in range(HAND_SIZE - 1):
+            shifted[:, j] = np.where(j >= pos, hand[:, j + 1], hand[:, j])
+        shifted[:, -1] = self._draw(g)
+        hands[rows] = shifted
+
+        # 空闲槽位保留的是已结束对局的合法状态，整体检查即可
+        S = self.S
+        if (S < 0).any():
+            side, stat, k = np.argwhere(S < 0)[0]
+            label = 'Player' if side == 0 else 'Enemy'
+            raise RuntimeError(f"{label} has negative {STATS[stat]} ({S[side, stat, k]})")
+
+        again = np.zeros(g.size, dtype=bool)
+        again[can] = self.play_again[card[can]]
+        self.active[g] = np.where(again, a, 1 - a)
+
+        t0, t1 = S[0, TOWER, g], S[1, TOWER, g]
+        done = ~((t0 > 0) & (t0 < WIN_TOWER) & (t1 > 0) & (t1 < WIN_TOWER))
+        finished = g[done]
+        self.live[finished] = False
+        return finished
+
+    def _run_programs(self, F, pc, pme, popp):
+        """
+        按槽位执行各对局所打出卡的 op 序列: 第 j 步同时执行所有卡的第 j 个 op，
+        同一对局内的 op 顺序与 compile_effect 一致。
+        """
+        K, T = self.K, self.tables
+        sel = np.arange(pc.size)
+        for j in range(T.width):
+            sel = sel[T.n_ops[pc[sel]] > j]
+            if not sel.size:
+                break
+            c = pc[sel]
+            me, opp = pme[sel], popp[sel]
+            params = T.main[c, j]
+
+            # 'if': 条件不成立的对局换用 else 分支的参数
+            cond = np.flatnonzero(T.is_if[c, j])
+            if cond.size:
+                cc = c[cond]
+                lside, lstat, cmp, rside, rstat, rconst = (t[cc, j] for t in T.cond)
+                lhs = F[np.where(lside == 0, me[cond], opp[cond]) + lstat * K]
+                rhs = np.where(rside < 0, rconst,
+                               F[np.where(rside == 0, me[cond], opp[cond]) + rstat * K])
+                hit = np.where(cmp == 0, lhs < rhs, np.where(cmp == 1, lhs > rhs, lhs == rhs))
+                miss = cond[~hit]
+                params[miss] = T.other[c[miss], j]
+            kind, side, stat, delta, floor = params.T
+
+            base = np.where(side == 0, me, opp)
+
+            k = np.flatnonzero(kind == OP_ADD)
+            if k.size:
+                idx = base[k] + stat[k] * K
+                F[idx] = np.maximum(floor[k], F[idx] + delta[k])
+
+            k = np.flatnonzero(kind == OP_DAMAGE)
+            if k.size:
+                n = delta[k]
+                w, t = base[k] + WALL * K, base[k] + TOWER * K
+                wall, tower = F[w], F[t]
+                excess = n - wall
+                over = excess > 0
+                F[w] = np.where(over, 0, wall - n)
+                F[t] = np.where(over, np.maximum(0, tower - excess), tower)
+
+            k = np.flatnonzero(kind == OP_SPECIAL)
+            for card in (np.unique(c[k]) if k.size else ()):
+                g = k[c[k] == card]
+                _apply_op(F, self.ops[card][j], (me[g], opp[g]), K)
+
+    def collect(self, g, tally: dict):
+        """把已结束对局 g 的结果累加进 tally (格式同 card_simulator.new_tally)。"""
+        if not g.size:
+            return
+        S = self.S
+        player_won = (S[0, TOWER, g] >= WIN_TOWER) | (S[1, TOWER, g] <= 0)
+        turns, dead = self.turns[g], self.dead_hands[g]
+        n_won = int(player_won.sum())
+        tally['games'] += g.size
+        tally['player_wins'] += n_won
+        tally['enemy_wins'] += g.size - n_won
+        tally['total_turns'] += int(turns.sum())
+        lo = int(turns.min())
+        tally['min_turns'] = lo if tally['min_turns'] is None else min(tally['min_turns'], lo)
+        tally['max_turns'] = max(tally['max_turns'], int(turns.max()))
+        for t, cnt in zip(*np.unique(turns, return_counts=True)):
+            tally['turn_histogram'][int(t)] = tally['turn_histogram'].get(int(t), 0) + int(cnt)
+        tally['total_dead_hands'] += int(dead.sum())
+        tally['games_with_dead_hands'] += int((dead > 0).sum())
+        plays = self.plays[g]
+        winner_side = np.where(player_won, 0, 1)
+        tally['card_plays'] = (np.asarray(tally['card_plays']) + plays.sum(axis=(0, 1))).tolist()
+        tally['card_wins'] = (np.asarray(tally['card_wins'])
+                              + plays[np.arange(g.size), winner_side].sum(axis=0)).tolist()
+
+
+def run_batched(cards: list, count: int, seed: int = None, batch: int = 4096) -> dict:
+    """
+    以 batch 个槽位同步模拟共 count 局，返回与 card_simulator.run_many 同格式的统计。
+    """
+    if batch < 1:
+        raise ValueError(f"batch must be at least 1, got {batch}")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+    sim = BatchSimulator(cards, min(batch, max(count, 1)), np.random.default_rng(seed))
+    tally = new_tally(len(cards))
+    tally['seed'] = seed
+
+    started = min(sim.K, count)
+    sim.start(np.arange(started))
+    while sim.live.any():
+        finished = sim.step()
+        sim.collect(finished, tally)
+        # 结束的槽位立即开新局，保持批次满载
+        refill = finished[:max(0, count - started)]
+        if refill.size:
+            sim.start(refill)
+            started += refill.size
+    return tally
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Citadel batched game simulator (NumPy lockstep)')
+    ap.add_argument('count', nargs='?', type=int, default=1, help='number of games to simulate')
+    ap.add_argument('--batch', type=int, default=4096, help='concurrent games kept in arrays')
+    ap.add_argument('--seed', type=int, default=None, help='random seed for reproducible runs')
+    ap.add_argument('--ir', type=Path, default=None,
+                    help='run on a compiled card IR (tools/card_ir.py) instead of parsing cards.json')
+    args = ap.parse_args(argv)
+    if args.count <= 0:
+        ap.error('count must be a positive number of games')
+    if args.batch <= 0:
+        ap.error('--batch must be a positive number of games')
+
+    if args.ir:
+        from card_ir import CARDS_PATH, load_ir
+        try:
+            cards = load_ir(args.ir, CARDS_PATH)['cards']      # IR 落后于 cards.json 时拒绝运行
+        except (OSError, ValueError) as err:
+            ap.error(str(err))
+    else:
+        cards = load_cards()
+    print(f"Running {args.count} simulated games in batches of {args.batch}...")
+    try:
+        tally = run_batched(cards, args.count, seed=args.seed, batch=args.batch)
+    except RuntimeError as err:
+        print(f"Simulation error: {err}")
+        sys.exit(1)
+    print(f"Seed : {tally['seed']}")
+    print_tally(tally)
+    print_card_plays(tally, cards)
+
+
+if __name__ == '__main__':
+    main()
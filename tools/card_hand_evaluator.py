@@ -0,0 +1,201 @@
+"""
+Citadel Hand / Deck Evaluator
+===============================
+在 CardScorer 的单卡净价值之上，对"从 2 张一套的卡组中抽 6 张"的所有可能手牌
+做精确组合计算 (不枚举手牌):
+
+  - 手牌期望总价值      : 线性期望，6 × 卡组平均净价值
+  - 可出牌概率          : 给定资源状态下手牌里至少有一张付得起的卡 (与 canAfford 一致)
+  - 期望最佳出牌价值    : 付得起的卡中净价值最高者的期望 (顺序统计量)
+  - 期望贪心出牌价值    : 模拟器策略 (手牌中第一张付得起的卡) 打出的卡的期望净价值
+  - 再来一回合连锁      : 仅靠起手牌、按费用从低到高能连续打出的 Play again 卡数分布
+
+卡组按副本展开为 N 张 (每张卡 copies 份)，C(N, 6) 种手牌等概率。
+连锁分布按颜色分别做动态规划 (状态: 已选张数 × 已花资源 × 连锁张数，
+超过手牌上限或资源上限的分支直接剪掉)，再在颜色之间做卷积。
+
+用法:
+  python tools/card_hand_evaluator.py
+  python tools/card_hand_evaluator.py --bricks 3 --gems 10 --beasts 7 --colors Red,Blue
+"""
+
+import argparse
+import sys
+from math import comb
+
+from card_power_analyzer import CardScorer
+from card_simulator import INITIAL_STATE, COLOR_RESOURCE, HAND_SIZE, load_cards
+
+# 强制 stdout 使用 UTF-8 (兼容 Windows GBK 终端)
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+COPIES = 2      # 每张卡在牌库中的份数 (与 simulate.js 的 initDeck 一致)
+
+# 默认资源状态: 开局第一回合产出之后
+DEFAULT_RESOURCES = {
+    'bricks': INITIAL_STATE['bricks'] + INITIAL_STATE['quarries'],
+    'gems':   INITIAL_STATE['gems'] + INITIAL_STATE['magic'],
+    'beasts': INITIAL_STATE['beasts'] + INITIAL_STATE['dungeon'],
+}
+
+
+class HandEvaluator:
+    """
+    预先计算每张卡的 (净价值, 颜色, 费用, 是否再来一回合) 向量，
+    之后每次 evaluate() 只做与卡牌数成线性 (连锁部分为小规模 DP) 的组合计算。
+    """
+
+    def __init__(self, cards: list, scorer: CardScorer = None, copies: int = COPIES,
+                 hand_size: int = HAND_SIZE):
+        scorer = scorer or CardScorer()
+        self.cards = cards
+        self.copies = copies
+        self.hand_size = hand_size
+        self.net = [scorer.score(c)['net_value'] for c in cards]
+        self.color = [c.get('color') for c in cards]
+        self.cost = [c.get('cost', 0) for c in cards]
+        self.play_again = ['play again' in c.get('effect', '').lower() for c in cards]
+
+    def deck(self, colors=None) -> list:
+        """卡组中参与抽牌的卡牌下标；colors 为 None 时使用整副卡组。"""
+        return [i for i, col in enumerate(self.color) if colors is None or col in colors]
+
+    def affordable(self, i: int, resources: dict) -> bool:
+        resource = COLOR_RESOURCE.get(self.color[i])
+        return resource is not None and resources.get(resource, 0) >= self.cost[i]
+
+    def evaluate(self, resources: dict = None, colors=None) -> dict:
+        resources = DEFAULT_RESOURCES if resources is None else resources
+        idx = self.deck(colors)
+        k, n = self.copies, self.hand_size
+        N = k * len(idx)
+        if N < n:
+            raise ValueError(f"deck has {N} cards, fewer than a {n}-card hand")
+        hands = comb(N, n)
+
+        playable = sorted((i for i in idx if self.affordable(i, resources)),
+                          key=lambda i: self.net[i], reverse=True)
+        m = k * len(playable)
+
+        # 最佳出牌: 把付得起的副本按净价值降序排成 a_1..a_m，
+        # a_j 是手牌中最好的一张 <=> a_j 在手且 a_1..a_{j-1} 都不在手: C(N - j, n - 1) 种
+        best = 0.0
+        for rank, i in enumerate(j for j in playable for _ in range(k)):
+            ways = comb(N - rank - 1, n - 1)
+            if not ways:
+                break
+            best += self.net[i] * ways
+
+        # 贪心出牌: 手牌顺序随机，第一张付得起的卡在手牌的付得起卡中均匀分布
+        # P(指定副本在手且手中共有 a 张付得起) = C(m-1, a-1) C(N-m, n-a) / C(N, n)
+        share = sum(comb(m - 1, a - 1) * comb(N - m, n - a) / a for a in range(1, n + 1)) if m else 0
+        greedy = sum(self.net[i] for i in playable) * k * share
+
+        chain = self._chain_distribution(idx, resources)
+        p_chain = [ways / hands for ways in chain]
+        return {
+            'deck_size': N,
+            'hands': hands,
+            'expected_hand_value': n * k * sum(self.net[i] for i in idx) / N,
+            'playable_probability': 1 - comb(N - m, n) / hands,
+            'expected_best_play': best / hands,
+            'expected_greedy_play': greedy / hands,
+            'chain_distribution': p_chain,
+            'expected_chain': sum(length * p for length, p in enumerate(p_chain)),
+        }
+
+    def _chain_distribution(self, idx: list, resources: dict) -> list:
+        """
+        返回 ways[L]: 起手牌最多能连续打出 L 张 Play again 卡的手牌数。
+        每种颜色独立: 该颜色的 Play again 卡按费用升序处理，资源够就计入连锁。
+        """
+        n, k = self.hand_size, self.copies
+        # 每种颜色一张表 {(张数, 连锁数): 手牌数}；不属于任何连锁的卡合为一组
+        others = 0
+        tables = []
+        by_color = {}
+        for i in idx:
+            resource = COLOR_RESOURCE.get(self.color[i])
+            if self.play_again[i] and resource is not None:
+                by_color.setdefault(resource, []).append(self.cost[i])
+            else:
+                others += k
+        for resource, costs in by_color.items():
+            budget = resources.get(resource, 0)
+            # 状态 (张数, 已花资源, 连锁数) -> 方案数
+            states = {(0, 0, 0): 1}
+            for cost in sorted(costs):
+                nxt = {}
+                for (h, spent, length), ways in states.items():
+                    for j in range(min(k, n - h) + 1):
+                        s, L = spent, length
+                        for _ in range(j):
+                            if s + cost <= budget:
+                                s, L = s + cost, L + 1
+                        key = (h + j, s, L)
+                        nxt[key] = nxt.get(key, 0) + ways * comb(k, j)
+                states = nxt
+            table = {}
+            for (h, _, length), ways in states.items():
+                table[(h, length)] = table.get((h, length), 0) + ways
+            tables.append(table)
+
+        # 颜色之间按 (张数, 连锁数) 卷积，张数超过手牌上限的组合剪掉
+        total = {(h, 0): comb(others, h) for h in range(n + 1)}
+        for table in tables:
+            nxt = {}
+            for (h1, l1), w1 in total.items():
+                for (h2, l2), w2 in table.items():
+                    if h1 + h2 <= n:
+                        key = (h1 + h2, l1 + l2)
+                        nxt[key] = nxt.get(key, 0) + w1 * w2
+            total = nxt
+        ways = [0] * (n + 1)
+        for (h, length), w in total.items():
+            if h == n:
+                ways[length] += w
+        return ways
+
+
+def print_evaluation(label: str, res: dict):
+    print(f"\n{'='*70}")
+    print(f"  {label}  ({res['deck_size']} cards, {res['hands']:,} possible hands)")
+    print(f"{'='*70}")
+    print(f"  Expected hand value      : {res['expected_hand_value']:+.2f} pt")
+    print(f"  P(at least one playable) : {res['playable_probability']:.2%}")
+    print(f"  Expected best play       : {res['expected_best_play']:+.2f} pt")
+    print(f"  Expected greedy play     : {res['expected_greedy_play']:+.2f} pt")
+    print(f"  Expected play-again chain: {res['expected_chain']:.3f} cards")
+    for length, p in enumerate(res['chain_distribution']):
+        if p > 0:
+            print(f"    chain {length}: {p:8.3%}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Exact 6-card hand statistics for the Citadel deck')
+    for resource, default in DEFAULT_RESOURCES.items():
+        ap.add_argument(f'--{resource}', type=int, default=default,
+                        help=f'{resource} available (default {default})')
+    ap.add_argument('--colors', default=None,
+                    help='comma-separated colors for a color-limited deck, e.g. Red,Blue')
+    args = ap.parse_args(argv)
+
+    resources = {r: getattr(args, r) for r in DEFAULT_RESOURCES}
+    evaluator = HandEvaluator(load_cards())
+    print(f"Resources: " + ', '.join(f"{r}={v}" for r, v in resources.items()))
+
+    if args.colors:
+        colors = [c.strip() for c in args.colors.split(',')]
+        unknown = [c for c in colors if c not in COLOR_RESOURCE]
+        if unknown:
+            ap.error(f"unknown color(s) {', '.join(unknown)}; choose from {', '.join(COLOR_RESOURCE)}")
+        print_evaluation(f"[{'+'.join(colors)}] deck", evaluator.evaluate(resources, colors))
+        return
+    print_evaluation("[ALL] Full deck", evaluator.evaluate(resources))
+    for color in COLOR_RESOURCE:
+        print_evaluation(f"[{color}] only", evaluator.evaluate(resources, [color]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Citadel Card Effect IR
+========================
+把 src/cards.json 一次性编译为带版本号的紧凑中间表示 (IR)，
+分析器与模拟器直接读取 IR，热路径上不再做任何效果文本解析。
+
+每张卡的 IR 条目只保留各消费方读取的卡牌字段 (IR_CARD_FIELDS: id / name / name_zh / color / cost / effect;
+effect_zh、image_prompt 等只供前端使用的字段不进入 IR)，并增加:
+  ops        : 模拟器语义的类型化操作序列 (见 card_simulator 中 compile_effect 的 op 说明，
+               tuple 在 JSON 中存为 list)，如 gain / lose / damage / tower_damage /
+               wall_damage / if / swap ...
+  play_again : 是否再来一回合
+  signals    : 分析器语义的信号字典 (EffectParser.parse 的结果，键顺序与打分累加顺序一致)
+  unparsed   : 没被完整解析的文本片段 [{'consumer': 'analyzer' | 'simulator', 'text': 片段}, ...]
+
+IR 条目仍是合法的卡牌字典: CardScorer.score / signal_row / SignalMatrix 遇到 signals 字段、
+card_simulator.card_program (compile_cards 与批量模拟器共用) 遇到 ops 字段时直接使用，不再解析 effect。
+card_simulator / card_batch_simulator / card_tournament / card_power_analyzer / card_power_server
+都可用 --ir 读取 IR。
+
+"未完整解析"按两条规则判定 (启发式，宁可多报):
+  - 效果中的每个数字 (含 1/2 这类分数) 都应被某个消费方用到:
+    分析器看数字是否落在某条解析规则的匹配范围内，模拟器看数字是否出现在 op 的数值里
+  - 不含数字的子句 (按 . 和 , 切分，else 等连接词除外) 至少要命中分析器的一条规则，
+    否则该子句对分析器不可见 (模拟器没有子句级的位置信息，这类子句只对分析器报告)
+
+用法:
+  python tools/card_ir.py                       # 编译到 tools/card_ir.json 并列出未解析片段
+  python tools/card_ir.py --strict              # 有未解析片段时以退出码 1 结束
+  python tools/card_power_analyzer.py --ir tools/card_ir.json
+  python tools/card_simulator.py 1000 --ir tools/card_ir.json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+from card_power_analyzer import EffectParser, _RULES
+from card_simulator import compile_effect
+
+# 强制 stdout 使用 UTF-8 (兼容 Windows GBK 终端)
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+IR_VERSION = 1
+IR_PATH = Path(__file__).parent / 'card_ir.json'
+IR_CARD_FIELDS = ('id', 'name', 'name_zh', 'color', 'cost', 'effect')     # 从 cards.json 带入 IR 的字段
+CARDS_PATH = Path(__file__).parent.parent / 'src' / 'cards.json'
+
+_NUMBER = re.compile(r'\d+(?:/\d+)?')
+_QUANTITY = re.compile(r"[-+]?\d+(?:/\d+)?(?: [a-z']+)?")     # 数字连同其后的一个词
+_CLAUSE = re.compile(r'[^.,]+')
+_CONNECTIVES = {'else', 'round up'}     # 只修饰前后子句的连接词，本身不是效果
+
+
+class IRVersionError(ValueError):
+    """IR 文件的版本与当前编译器不一致，需要重新编译。"""
+
+
+# ─── 未解析片段检测 ───────────────────────────────────────────────────────────
+def _op_numbers(ops) -> set:
+    """op 序列中用到的全部数值 (字符串形式，与效果文本中的数字对比)。"""
+    nums = set()
+    for op in ops:
+        kind = op[0]
+        if kind in ('damage', 'tower_damage', 'wall_damage'):
+            nums.add(str(op[2]))
+        elif kind in ('gain', 'lose'):
+            nums.add(str(op[3]))            # lose 的下限 (0/1) 不是文本里的数字
+        elif kind == 'steal_half':
+            nums.update((str(op[2]), '1/2'))
+        elif kind == 'if':
+            rhs = op[1][2]
+            if isinstance(rhs, int):
+                nums.add(str(rhs))
+            nums |= _op_numbers(op[2]) | _op_numbers(op[3])
+    return nums
+
+
+def _quantity_at(e: str, pos: int) -> str:
+    start = pos - 1 if pos and e[pos - 1] in '+-' else pos
+    return _QUANTITY.match(e, start).group()
+
+
+def unparsed_fragments(effect: str, ops) -> list:
+    """返回 [{'consumer', 'text'}, ...]，按在效果文本中出现的顺序，同一片段不重复。"""
+    e = effect.lower()
+    # 覆盖范围按每条规则的全部匹配计算 ('first' 规则的后续匹配也算被识别)
+    spans = [(m.start(), m.end()) for _, pattern, _ in _RULES for m in re.finditer(pattern, e)]
+
+    def covered(lo, hi):
+        return any(s < hi and lo < t for s, t in spans)
+
+    op_nums = _op_numbers(ops)
+    found = []
+
+    def flag(consumer, text):
+        item = {'consumer': consumer, 'text': text}
+        if item not in found:
+            found.append(item)
+
+    for m in _NUMBER.finditer(e):
+        if not covered(m.start(), m.end()):
+            flag('analyzer', _quantity_at(e, m.start()))
+        if m.group() not in op_nums:
+            flag('simulator', _quantity_at(e, m.start()))
+    for m in _CLAUSE.finditer(e):
+        text = m.group().strip()
+        if text and text not in _CONNECTIVES and not _NUMBER.search(text) and not covered(m.start(), m.end()):
+            flag('analyzer', text)
+    return found
+
+
+# ─── 编译 ─────────────────────────────────────────────────────────────────────
+def compile_card(card: dict, parser: EffectParser = None) -> dict:
+    parser = parser or EffectParser()
+    effect = card.get('effect', '')
+    ops = compile_effect(effect)
+    entry = {k: card[k] for k in IR_CARD_FIELDS if k in card}
+    entry['ops'] = ops
+    entry['play_again'] = 'play again' in effect.lower()
+    entry['signals'] = parser.parse(effect)
+    entry['unparsed'] = unparsed_fragments(effect, ops)
+    return entry
+
+
+def source_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def compile_ir(cards: list, source: str = None) -> dict:
+    """
+    编译整副卡组。source 为 cards.json 内容的哈希，load_ir 用它判断 IR 是否过期。
+    同一效果文本只解析一次。
+    """
+    parser = EffectParser()
+    return {
+        'version': IR_VERSION,
+        'source': source,
+        'cards': [compile_card(c, parser) for c in cards],
+    }
+
+
+def compile_file(cards_path: Path = CARDS_PATH) -> dict:
+    data = cards_path.read_bytes()
+    return compile_ir(json.loads(data.decode('utf-8')), source_hash(data))
+
+
+def write_ir(ir: dict, path: Path = IR_PATH):
+    # 紧凑格式: 无缩进、无多余空格；一行一张卡便于 diff
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{{"version":{ir["version"]},"source":{json.dumps(ir["source"])},"cards":[\n')
+        f.write(',\n'.join(json.dumps(c, ensure_ascii=False, separators=(',', ':')) for c in ir['cards']))
+        f.write('\n]}\n')
+
+
+def load_ir(path: Path = IR_PATH, cards_path: Path = None) -> dict:
+    """
+    读取 IR 并校验版本；给出 cards_path 时还校验 IR 是否由该文件的当前内容编译而来。
+    版本不符抛 IRVersionError，内容过期抛 ValueError。
+    """
+    with open(path, encoding='utf-8') as f:
+        ir = json.load(f)
+    if ir.get('version') != IR_VERSION:
+        raise IRVersionError(f"{path} is IR version {ir.get('version')}, expected {IR_VERSION}; "
+                             f"recompile with tools/card_ir.py")
+    if cards_path is not None and ir.get('source') != source_hash(cards_path.read_bytes()):
+        raise ValueError(f"{path} is out of date with {cards_path}; recompile with tools/card_ir.py")
+    return ir
+
+
+def print_unparsed(ir: dict):
+    flagged = [c for c in ir['cards'] if c['unparsed']]
+    print(f"\n{'='*70}")
+    print(f"  Unparsed effect text ({len(flagged)} of {len(ir['cards'])} cards)")
+    print(f"{'='*70}")
+    for c in flagged:
+        print(f"  {c['id']:<10} {c['name']:<22} {c['effect']}")
+        for item in c['unparsed']:
+            print(f"    {item['consumer']:<10} \"{item['text']}\"")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Compile cards.json into the versioned card-effect IR')
+    ap.add_argument('--cards', type=Path, default=CARDS_PATH, help='cards.json to compile')
+    ap.add_argument('--output', type=Path, default=IR_PATH, help='IR output path')
+    ap.add_argument('--strict', action='store_true', help='exit with status 1 if any effect is not fully parsed')
+    args = ap.parse_args(argv)
+
+    if not args.cards.exists():
+        print(f"[ERROR] cards.json not found: {args.cards}")
+        sys.exit(1)
+    ir = compile_file(args.cards)
+    write_ir(ir, args.output)
+    ops = sum(len(c['ops']) for c in ir['cards'])
+    print(f"[DONE] {len(ir['cards'])} cards, {ops} ops -> {args.output} (IR v{IR_VERSION})")
+    print_unparsed(ir)
+    if args.strict and any(c['unparsed'] for c in ir['cards']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
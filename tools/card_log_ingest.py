@@ -0,0 +1,416 @@
+"""
+Citadel Game Log Ingestor
+===========================
+流式读取 JSONL 对局日志 (文件或目录，支持 .gz)，单遍、内存有界地统计每张卡的实战表现，
+并与 CardScorer 的静态净价值对照，找出"打分高但实战差"或相反的卡。
+
+每张卡的在线累加量 (与日志规模无关，只与卡牌数成正比):
+  - 出场率        : 打出过该卡的"一方一局" (每局两方) 占全部一方一局的比例
+  - 打出后胜率    : 打出过该卡的一方最终获胜的比例 (一局内打出多次只计一次)
+  - 出牌回合分布  : 按 card_simulator.TURN_BUCKETS 分桶，另以 Welford 算法累计均值/标准差
+  - 资源情境      : 打出时该颜色资源的富余量 (存量 - 费用) 的均值/标准差
+
+支持两种日志行:
+  - card_simulator.py --log 写出的对局记录:
+      {"winner": "PLAYER", "turns": 57, "plays": [[回合, "P"|"E", 卡牌 id, 付费前资源存量], ...]}
+  - 游戏内 exportDebugLog 导出的对象 (压成一行): 按 log 中的 turn_header / play_again 条目
+    重建回合号 (与模拟器一样，每次轮到一方出牌算一回合)；这种日志没有资源情境
+
+大文件按字节区间切成若干块并行处理 (每块从区间内第一个完整行开始)，
+.gz 文件不能随机访问，整个文件作为一块。各块的累加量按块顺序合并，结果与进程数无关。
+
+用法:
+  python tools/card_simulator.py 100000 --seed 1 --log logs/sim.jsonl.gz
+  python tools/card_log_ingest.py logs/ --workers 8
+  python tools/card_log_ingest.py logs/sim.jsonl.gz --top 30 --out impact.json
+"""
+
+import argparse
+import gzip
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+from card_power_analyzer import CardScorer, COLOR_MARK
+from card_simulator import TURN_BUCKETS, turn_bucket, load_cards
+
+# 强制 stdout 使用 UTF-8 (兼容 Windows GBK 终端)
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+CHUNK_BYTES = 64 * 1024 * 1024      # 未压缩文件的切块大小
+LOG_SUFFIXES = ('.jsonl', '.jsonl.gz', '.ndjson', '.ndjson.gz')
+_BUCKET_INDEX = {label: i for i, (label, _) in enumerate(TURN_BUCKETS)}
+
+
+# ─── 在线累加量 ───────────────────────────────────────────────────────────────
+# 均值/方差以 [n, mean, m2] 存储 (Welford)，两个累加量可用 Chan 公式合并
+def moments_add(mo: list, x: float):
+    mo[0] += 1
+    delta = x - mo[1]
+    mo[1] += delta / mo[0]
+    mo[2] += delta * (x - mo[1])
+
+
+def moments_merge(into: list, part: list):
+    n = into[0] + part[0]
+    if part[0] == 0:
+        return
+    delta = part[1] - into[1]
+    into[2] += part[2] + delta * delta * into[0] * part[0] / n
+    into[1] += delta * part[0] / n
+    into[0] = n
+
+
+def moments_std(mo: list):
+    return math.sqrt(mo[2] / mo[0]) if mo[0] > 1 else 0.0
+
+
+def new_stats(n_cards: int) -> dict:
+    return {
+        'lines': 0, 'bad_lines': 0, 'games': 0,
+        'player_wins': 0, 'enemy_wins': 0, 'undecided': 0,
+        'unknown_plays': 0,                                     # 卡牌 id 不在 cards.json 中的出牌
+        'plays': [0] * n_cards,                                 # 出牌次数
+        'side_games': [0] * n_cards,                            # 打出过该卡的一方一局数
+        'side_wins': [0] * n_cards,                             # 其中该方获胜的数目
+        'turn_buckets': [[0] * len(TURN_BUCKETS) for _ in range(n_cards)],
+        'turn_moments': [[0, 0.0, 0.0] for _ in range(n_cards)],
+        'slack_moments': [[0, 0.0, 0.0] for _ in range(n_cards)],
+    }
+
+
+def merge_stats(into: dict, part: dict) -> dict:
+    """把 part 合并进 into (原地修改并返回 into)。"""
+    for key in ('lines', 'bad_lines', 'games', 'player_wins', 'enemy_wins', 'undecided', 'unknown_plays'):
+        into[key] += part[key]
+    for key in ('plays', 'side_games', 'side_wins'):
+        into[key] = [a + b for a, b in zip(into[key], part[key])]
+    for a, b in zip(into['turn_buckets'], part['turn_buckets']):
+        for i, v in enumerate(b):
+            a[i] += v
+    for key in ('turn_moments', 'slack_moments'):
+        for a, b in zip(into[key], part[key]):
+            moments_merge(a, b)
+    return into
+
+
+# ─── 日志行解析 ───────────────────────────────────────────────────────────────
+def normalize(record: dict):
+    """
+    把一行日志统一为 (winner, plays)，winner 为 'PLAYER' / 'ENEMY' / None，
+    plays 为 [(回合, 是否玩家, 卡牌 id, 付费前资源存量或 None), ...]。无法识别时返回 None。
+    """
+    if 'plays' in record:
+        plays = [(p[0], p[1] == 'P', p[2], p[3] if len(p) > 3 else None) for p in record['plays']]
+        return record.get('winner'), plays
+    if isinstance(record.get('log'), list):
+        # exportDebugLog: log 新条目在前；开局的 turn_header 记为第 1 回合
+        plays, turn = [], 0
+        for entry in reversed(record['log']):
+            kind = entry.get('type')
+            if kind in ('turn_header', 'play_again'):
+                turn += 1
+            elif kind == 'played' and isinstance(entry.get('card'), dict):
+                plays.append((max(turn, 1), bool(entry.get('isPlayer')), entry['card'].get('id'), None))
+        return record.get('winner'), plays
+    return None
+
+
+def ingest_line(stats: dict, line: bytes, index: dict, cost: list):
+    stats['lines'] += 1
+    try:
+        parsed = normalize(json.loads(line))
+    except (ValueError, TypeError, IndexError, KeyError, AttributeError):
+        parsed = None
+    if parsed is None:
+        stats['bad_lines'] += 1
+        return
+    winner, plays = parsed
+    stats['games'] += 1
+    if winner == 'PLAYER':
+        stats['player_wins'] += 1
+    elif winner == 'ENEMY':
+        stats['enemy_wins'] += 1
+    else:
+        stats['undecided'] += 1
+
+    seen = set()
+    for turn, by_player, card_id, avail in plays:
+        j = index.get(card_id)
+        if j is None:
+            stats['unknown_plays'] += 1
+            continue
+        stats['plays'][j] += 1
+        seen.add((j, by_player))
+        stats['turn_buckets'][j][_BUCKET_INDEX[turn_bucket(turn)]] += 1
+        moments_add(stats['turn_moments'][j], turn)
+        if avail is not None:
+            moments_add(stats['slack_moments'][j], avail - cost[j])
+    for j, by_player in seen:
+        stats['side_games'][j] += 1
+        if winner is not None and (winner == 'PLAYER') == by_player:
+            stats['side_wins'][j] += 1
+
+
+# ─── 分块读取 ─────────────────────────────────────────────────────────────────
+def iter_log_files(paths: list) -> list:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(p for p in path.rglob('*') if p.is_file() and p.name.endswith(LOG_SUFFIXES))
+        else:
+            files.append(path)
+    return files
+
+
+def plan_chunks(files: list, chunk_bytes: int = CHUNK_BYTES) -> list:
+    """把文件切成 (路径, 起始字节, 结束字节) 块；.gz 文件整体为一块 (结束字节为 None)。"""
+    chunks = []
+    for path in files:
+        if path.suffix == '.gz':
+            chunks.append((str(path), 0, None))
+            continue
+        size = path.stat().st_size
+        for start in range(0, max(size, 1), chunk_bytes):
+            chunks.append((str(path), start, min(start + chunk_bytes, size)))
+    return chunks
+
+
+def iter_chunk_lines(path: str, start: int, end):
+    """逐行产出起始位置落在 [start, end) 内的行；end 为 None 时读完整个 (gzip) 文件。"""
+    if end is None:
+        with gzip.open(path, 'rb') as f:
+            yield from f
+        return
+    with open(path, 'rb') as f:
+        if start:
+            # 从 start-1 读到行尾: 若 start 恰好是行首，只跳过上一行的换行符
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+
+def ingest_chunk(chunk: tuple, index: dict, cost: list) -> dict:
+    stats = new_stats(len(cost))
+    for line in iter_chunk_lines(*chunk):
+        if line.strip():
+            ingest_line(stats, line, index, cost)
+    return stats
+
+
+_WORKER = {}
+
+
+def _init_worker(index: dict, cost: list):
+    _WORKER['index'], _WORKER['cost'] = index, cost
+
+
+def _ingest_chunk_in_worker(chunk):
+    return chunk, ingest_chunk(chunk, _WORKER['index'], _WORKER['cost'])
+
+
+def ingest(paths: list, cards: list, workers: int = 1, chunk_bytes: int = CHUNK_BYTES,
+           on_progress=None) -> dict:
+    """
+    单遍读取 paths 下的全部日志，返回合并后的统计。
+    每块处理完调用 on_progress(已处理字节, 总字节, stats)。
+    """
+    index = {c['id']: j for j, c in enumerate(cards)}
+    cost = [c.get('cost', 0) for c in cards]
+    files = iter_log_files(paths)
+    chunks = plan_chunks(files, chunk_bytes)
+    total = sum(Path(p).stat().st_size if end is None else end - start for p, start, end in chunks)
+    stats = new_stats(len(cards))
+    stats['files'] = len(files)
+
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(index, cost)
+        parts = map(_ingest_chunk_in_worker, chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(chunks)), initializer=_init_worker,
+                                    initargs=(index, cost))
+        # 按块顺序合并 (浮点累加量的合并顺序固定)，结果与进程数无关
+        parts = pool.imap(_ingest_chunk_in_worker, chunks)
+    done = 0
+    try:
+        for (path, start, end), part in parts:
+            merge_stats(stats, part)
+            done += Path(path).stat().st_size if end is None else end - start
+            if on_progress:
+                on_progress(done, total, stats)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return stats
+
+
+# ─── 与静态净价值对照 ─────────────────────────────────────────────────────────
+def _ranks(values: list) -> list:
+    """降序名次 (1 起)，并列取平均名次。"""
+    order = sorted(range(len(values)), key=lambda i: -values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def spearman(xs: list, ys: list):
+    if len(xs) < 2:
+        return None
+    rx, ry = _ranks(xs), _ranks(ys)
+    mx, my = sum(rx) / len(rx), sum(ry) / len(ry)
+    cov = sum((a - mx) * (b - my) for a, b in zip(rx, ry))
+    vx = sum((a - mx) ** 2 for a in rx)
+    vy = sum((b - my) ** 2 for b in ry)
+    return cov / math.sqrt(vx * vy) if vx and vy else None
+
+
+def card_impact(stats: dict, cards: list, scorer: CardScorer = None, min_games: int = 30) -> dict:
+    """
+    把统计与 CardScorer 净价值逐卡拼接。impact = 打出后胜率 - 全部一方一局的平均胜率。
+    只有 side_games >= min_games 的卡参与排名与相关系数；从未打出的卡 (impact 为 None) 总是排除在外。
+    """
+    scorer = scorer or CardScorer()
+    decided = stats['player_wins'] + stats['enemy_wins']
+    side_total = 2 * stats['games']
+    baseline = decided / side_total if side_total else 0.0
+    rows = []
+    for j, card in enumerate(cards):
+        sg = stats['side_games'][j]
+        win_rate = stats['side_wins'][j] / sg if sg else None
+        turn_mo, slack_mo = stats['turn_moments'][j], stats['slack_moments'][j]
+        rows.append({
+            'id': card['id'],
+            'name': card['name'],
+            'color': card.get('color'),
+            'cost': card.get('cost', 0),
+            'net_value': scorer.score(card)['net_value'],
+            'plays': stats['plays'][j],
+            'play_rate': sg / side_total if side_total else 0.0,
+            'win_rate_when_played': win_rate,
+            'impact': None if win_rate is None else win_rate - baseline,
+            'turn_mean': turn_mo[1] if turn_mo[0] else None,
+            'turn_std': moments_std(turn_mo) if turn_mo[0] else None,
+            'turn_distribution': dict(zip((label for label, _ in TURN_BUCKETS), stats['turn_buckets'][j])),
+            'slack_mean': slack_mo[1] if slack_mo[0] else None,
+            'slack_std': moments_std(slack_mo) if slack_mo[0] else None,
+            'static_rank': None, 'observed_rank': None, 'rank_gap': None,
+        })
+    ranked = [r for r, sg in zip(rows, stats['side_games']) if sg >= max(min_games, 1)]
+    if ranked:
+        static = _ranks([r['net_value'] for r in ranked])
+        observed = _ranks([r['impact'] for r in ranked])
+        for r, s, o in zip(ranked, static, observed):
+            r['static_rank'], r['observed_rank'] = s, o
+            r['rank_gap'] = s - o      # > 0: 实战比静态打分好 (被低估)
+    return {
+        'baseline_win_rate': baseline,
+        'ranked_cards': len(ranked),
+        'spearman': spearman([r['net_value'] for r in ranked], [r['impact'] for r in ranked]),
+        'cards': rows,
+    }
+
+
+def print_summary(stats: dict, elapsed: float, nbytes: int):
+    print(f"\n{'='*70}")
+    print(f"  Ingested {stats['games']:,} games from {stats.get('files', 0)} file(s)"
+          f" ({nbytes / 1e6:,.1f} MB in {elapsed:.1f}s)")
+    print(f"{'='*70}")
+    games = stats['games'] or 1
+    print(f"  Player wins : {stats['player_wins']:,} ({stats['player_wins'] / games:.1%})")
+    print(f"  Enemy wins  : {stats['enemy_wins']:,} ({stats['enemy_wins'] / games:.1%})")
+    if stats['undecided']:
+        print(f"  Undecided   : {stats['undecided']:,}")
+    if stats['bad_lines']:
+        print(f"  Bad lines   : {stats['bad_lines']:,} of {stats['lines']:,}")
+    if stats['unknown_plays']:
+        print(f"  Unknown card ids: {stats['unknown_plays']:,} plays skipped")
+
+
+def print_impact(report: dict, top_n: int = 20):
+    rows = [r for r in report['cards'] if r['rank_gap'] is not None]
+    rho = report['spearman']
+    print(f"\n{'='*70}")
+    print(f"  Static net value vs observed impact ({report['ranked_cards']} cards, "
+          f"Spearman {'n/a' if rho is None else f'{rho:+.3f}'})")
+    print(f"  impact = win rate when played - {report['baseline_win_rate']:.1%} baseline;"
+          f" gap > 0 = underrated by the static score")
+    print(f"{'='*70}")
+    print(f"  {'Card':<26} {'Net':>6} {'Play%':>6} {'Win%':>6} {'Impact':>7} "
+          f"{'Turn':>6} {'Slack':>6} {'Static':>6} {'Obs':>5} {'Gap':>6}")
+    print(f"  {'-'*90}")
+    rows.sort(key=lambda r: abs(r['rank_gap']), reverse=True)
+    for r in rows[:top_n]:
+        mark = COLOR_MARK.get(r['color'], '   ')
+        slack = '-' if r['slack_mean'] is None else f"{r['slack_mean']:.1f}"
+        print(f"  {mark} {r['name']:<22} {r['net_value']:>+6.2f} {r['play_rate']:>6.1%} "
+              f"{r['win_rate_when_played']:>6.1%} {r['impact']:>+7.1%} {r['turn_mean']:>6.1f} "
+              f"{slack:>6} {r['static_rank']:>6.0f} {r['observed_rank']:>5.0f} {r['rank_gap']:>+6.0f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Stream JSONL game logs into per-card impact statistics')
+    ap.add_argument('paths', nargs='+', help='JSONL log files or directories (.jsonl / .jsonl.gz)')
+    ap.add_argument('--workers', type=int, default=1, help='worker processes')
+    ap.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // (1024 * 1024),
+                    help='split uncompressed files into chunks of this size')
+    ap.add_argument('--min-games', type=int, default=30,
+                    help='only rank cards played in at least this many side-games')
+    ap.add_argument('--top', type=int, default=20, help='cards to show, by largest rank disagreement')
+    ap.add_argument('--cards', type=Path, default=None, help='cards.json (default src/cards.json)')
+    ap.add_argument('--out', type=Path, default=None, help='write the per-card report as JSON')
+    args = ap.parse_args(argv)
+    if args.min_games < 1:
+        ap.error('--min-games must be at least 1')
+
+    cards = load_cards(args.cards)
+    missing = [p for p in args.paths if not os.path.exists(p)]
+    if missing:
+        print(f"[ERROR] not found: {', '.join(missing)}")
+        sys.exit(1)
+    started = time.perf_counter()
+    nbytes = 0
+
+    def progress(done, total, stats):
+        nonlocal nbytes
+        nbytes = total
+        print(f"\r  {done / 1e6:,.1f}/{total / 1e6:,.1f} MB, {stats['games']:,} games",
+              end='', file=sys.stderr, flush=True)
+
+    stats = ingest(args.paths, cards, workers=args.workers, chunk_bytes=args.chunk_mb * 1024 * 1024,
+                   on_progress=progress)
+    print(file=sys.stderr)
+    if not stats['games']:
+        print("[ERROR] no games found in the given logs")
+        sys.exit(1)
+    report = card_impact(stats, cards, min_games=args.min_games)
+    print_summary(stats, time.perf_counter() - started, nbytes)
+    print_impact(report, args.top)
+
+    if args.out:
+        summary = {k: v for k, v in stats.items() if not isinstance(v, list)}
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(dict(summary, **report), f, ensure_ascii=False, indent=2)
+        print(f"\n[DONE] Card impact report exported to: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
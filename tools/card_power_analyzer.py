@@ -1,33 +1,66 @@
 """
 Citadel Card Power Analyzer
 =============================
-战力/价值模型分析器。自动读?src/cards.json?
-用正则解析效果文本，为每张卡打出"净价值分"?
+战力/价值模型分析器。自动读取 src/cards.json，
+用正则解析效果文本，为每张卡打出"净价值分"。
 
 模型公式:
   Net Value = sum(Outputs) - ActionCost - ResourceCost
 
-积分权重 (可在 WEIGHTS 字典中调?:
-  - ?费资源消?      : -1.0 pt
-  - 打出任意1张卡行动消? -2.0 pt (统一基准)
+积分权重 (可在 WEIGHTS 字典中调整):
+  - 每1费资源消耗      : -1.0 pt
+  - 打出任意1张卡行动消耗: -2.0 pt (统一基准)
   - +1 Wall             : +0.75 pt
   - +1 Tower            : +0.85 pt
-  - 1 Damage            : +0.65 pt (可能被墙拦截，贬?
-  - Direct Tower Damage : +0.9  pt (穿墙攻塔，溢?
+  - 1 Damage            : +0.65 pt (可能被墙拦截，贬值)
+  - Direct Tower Damage : +0.9  pt (穿墙攻塔，溢价)
   - +1 Production(Q/M/D): +3.0  pt
   - -1 Enemy Production : +3.5  pt (破坏 > 建设)
   - +1 单次资源获得     : +0.9  pt
   - -1 己方单次资源     : -0.9  pt
-  - -1 敌方单次资源     : +0.5  pt (敌方失去资源折半价?
-  - Play Again          : +2.0  pt (抵消行动消?
+  - -1 敌方单次资源     : +0.5  pt (敌方失去资源折半价值)
+  - Play Again          : +2.0  pt (抵消行动消耗)
   - Draw/Discard        : +0.5  pt (手牌优势)
   - 高费溢价 (每费)     : +0.08 pt (节省行动力的规模溢价)
+
+按需查询 (只做所需的解析与打分，默认不写 JSON，适合编辑器钩子 / pre-commit):
+  python tools/card_power_analyzer.py --card card_042          # 单卡 (id 或英文名)
+  python tools/card_power_analyzer.py --color Red               # 单色完整榜单
+  python tools/card_power_analyzer.py --section overtuned       # 只看某一节
+  加 --json 时仍会写出完整的 card_power_results.json。
+
+权重拟合:
+  python tools/card_power_analyzer.py --fit --games 20000 --workers 4
+  用模拟对局 (tools/card_simulator.py) 回归各信号维度对出牌方胜率的贡献，
+  增量累加正规方程，不保留逐局记录。
+
+增量模式:
+  python tools/card_power_analyzer.py --watch
+  监视 src/cards.json，只重算内容有变化的卡，并修补 card_power_results.json。
+
+权重敏感性扫描:
+  python tools/card_power_analyzer.py --sweep play_again=1:3:11 --sweep damage=0.4:0.9:11
+  python tools/card_power_analyzer.py --sweep play_again=1:3 --sweep damage=0.4:0.9 --samples 100000 --workers 4
+  报告每张卡的名次波动与超模/战略分类的变化。
+
+性能剖析:
+  python tools/card_power_analyzer.py --profile profile.json
+  输出每条解析规则的耗时与命中次数 (总计及逐卡)，以及打分、报告输出的耗时 (JSON)。
+
+预编译 IR:
+  python tools/card_ir.py && python tools/card_power_analyzer.py --ir tools/card_ir.json
+  直接使用 IR 中的信号打分，不再解析效果文本 (见 tools/card_ir.py)。
+  IR 必须由当前的 cards.json (或 --cards 指定的文件) 编译而来，过期时报错退出；不能与 --watch 同用。
 """
 
+import argparse
+import bisect
+import functools
 import json
 import re
 import os
 import sys
+import time
 from pathlib import Path
 
 # 强制 stdout 使用 UTF-8 (兼容 Windows GBK 终端)
@@ -36,210 +69,261 @@ if hasattr(sys.stdout, 'reconfigure'):
 
 # ─── 权重配置 ──────────────────────────────────────────────────────────────────
 WEIGHTS = {
-    "action_cost":         -2.0,   # 打出任意卡牌本身消?
-    "resource_cost":       -1.0,   # ?点资源消?
+    "action_cost":         -2.0,   # 打出任意卡牌本身消耗
+    "resource_cost":       -1.0,   # 每1点资源消耗
     "wall":                +0.75,  # +1 Wall
     "tower":               +0.85,  # +1 Tower
-    "damage":              +0.65,  # 1点普通伤?先打?
+    "damage":              +0.65,  # 1点普通伤害(先打墙)
     "tower_damage":        +0.90,  # 1点直接塔伤害(穿墙)
     "production_own":      +3.0,   # +1 己方产能 (quarry/magic/dungeon)
-    "production_enemy":    -3.5,   # -1 己方产能 (被对手削?
+    "production_enemy":    -3.5,   # -1 己方产能 (被对手削弱)
     "production_enemy_de": +3.5,   # -1 敌方产能 (我方削弱对手)
     "resource_gain":       +0.9,   # +1 单次资源获得
     "resource_lose":       -0.9,   # -1 己方单次资源失去
-    "resource_enemy_lose": +0.5,   # 敌方失去1点资?(不确定性折?
+    "resource_enemy_lose": +0.5,   # 敌方失去1点资源 (不确定性折半)
     "play_again":          +2.0,   # 再来一回合
-    "draw_discard":        +0.5,   # ?弃牌
-    "high_cost_premium":   +0.08,  # 高费卡规模溢?每费 (>6费时生效)
+    "draw_discard":        +0.5,   # 抽/弃牌
+    "high_cost_premium":   +0.08,  # 高费卡规模溢价/每费 (>6费时生效)
 }
 
 # ─── 效果解析引擎 ───────────────────────────────────────────────────────────────
+# 解析规则表: (规则名, 正则, 模式)。
+#   'all'   : 等价 re.finditer，收集全部(同一规则内互不重叠的)匹配
+#   'first' : 等价 re.search，只保留最左侧的第一个匹配
+# 每条规则单独预编译 (首次需要时编译一次)。
+_RULES = [
+    # ── 己方正面 ──
+    ('wall',              r'\+(\d+)\s*wall', 'all'),
+    ('tower',             r'\+(\d+)\s*tower', 'all'),
+    ('quarry',            r'\+(\d+)\s*quarry', 'all'),
+    ('magic',             r'\+(\d+)\s*magic', 'all'),
+    ('dungeon',           r'\+(\d+)\s*dungeon', 'all'),
+    ('gain_plus',         r'\+(\d+)\s*(bricks?|gems?|recruits?|gem)', 'all'),
+    ('you_gain',          r'you gain (\d+)\s*(bricks?|gems?|recruits?)', 'all'),
+    ('gain',              r'(?<!\w)gain (\d+)\s*(bricks?|gems?|recruits?)', 'all'),
+    ('play_again',        r'play again', 'first'),
+    ('draw_discard',      r'draw \d+ card|discard \d+ card', 'first'),
+    # ── 己方负面 ──
+    ('you_lose',          r'(?:you lose|you lose) (\d+)\s*(bricks?|gems?|recruits?)', 'all'),
+    ('lose',              r'(?<![a-z])lose (\d+)\s*(bricks?|gems?|recruits?)', 'all'),
+    ('minus_quarry',      r'-(\d+)\s*quarry(?! of | enemy)', 'all'),
+    ('minus_magic',       r'-(\d+)\s*magic(?!\s*\>|\s*=)', 'all'),
+    ('minus_wall',        r'-(\d+)\s*wall', 'all'),
+    # ── 对敌伤害 ──
+    ('tower_damage',      r'(\d+)\s*damage to (?:enemy |all )?tower', 'all'),
+    ('enemy_damage',      r'(\d+)\s*damage to enemy(?!\s*tower)', 'all'),
+    ('all_enemy_towers',  r'(\d+)\s*damage to all enemy towers?', 'all'),
+    ('bare_damage',       r'(\d+)\s*damage(?!\s+to)', 'all'),
+    ('you_take',          r'(?:you take|tower take[s]?)\s*(\d+)\s*damage', 'all'),
+    # ── 对敌方资源/产能削减 ──
+    ('enemy_lose',        r'enemy (?:loses?|lose) (\d+)\s*(bricks?|gems?|recruits?)', 'all'),
+    ('enemy_production',  r'(?:-(\d+)\s*enemy\s*(quarry|dungeon)'
+                          r'|enemy\s+lose[s]?\s+(\d+)\s*(quarry|dungeon))', 'all'),
+    # ── 全玩家效果 ──
+    ('all_lose',          r'all players? (?:lose|loses) (\d+)\s*(bricks?|gems?|recruits?)', 'all'),
+    ('all_quarry_minus',  r'all player.{0,5}quarry.{0,5}-1|-1 to all player.{0,5}quarr', 'first'),
+    ('all_dungeon_plus',  r'\+1 to all player.{0,10}dungeon', 'first'),
+    ('all_quarry_plus',   r'\+1 to all player.{0,10}quarry', 'first'),
+    ('all_towers_damage', r'(\d+)\s*damage to all tower', 'all'),
+    # ── 条件效果修正 ──
+    ('conditional_damage', r'if.+?(\d+)\s*damage.+?else\s*(\d+)\s*damage', 'first'),
+    ('quarry_equals',     r'quarry = enemy quarry', 'first'),
+]
+
+# 各规则的预编译正则，首次解析时编译一次
+_COMPILED_RULES = None
+
+# 解析结果按效果文本做 LRU 缓存的容量 (整副卡组约 100 条不同文本)
+PARSE_CACHE_SIZE = 4096
+
+
+def _compiled_rules() -> list:
+    global _COMPILED_RULES
+    if _COMPILED_RULES is None:
+        _COMPILED_RULES = [(name, re.compile(pattern), mode) for name, pattern, mode in _RULES]
+    return _COMPILED_RULES
+
+
+def _scan(e: str) -> dict:
+    """
+    用每条规则的预编译正则匹配效果文本，返回 {规则名: [re.Match, ...]}。
+    'all' 规则收集 finditer 的全部匹配，'first' 规则只保留 search 的第一个匹配。
+    """
+    hits = {}
+    for name, rx, mode in _compiled_rules():
+        if mode == 'first':
+            m = rx.search(e)
+            hits[name] = [m] if m else []
+        else:
+            hits[name] = list(rx.finditer(e))
+    return hits
+
+
 class EffectParser:
     """
-    用正则表达式从英文效果文本中提取数值信号?
-    返回一个{维度: 数值}的字典?
+    用正则表达式从英文效果文本中提取数值信号，
+    返回一个{维度: 数值}的字典。
+    规则正则预编译，结果按效果文本缓存 (有界 LRU)。
     """
 
     def parse(self, effect: str) -> dict:
+        # 返回副本，调用方修改结果不会污染缓存
+        return dict(self._parse_cached(effect))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+    def _parse_cached(effect: str) -> dict:
         e = effect.lower()
+        hits = _scan(e)
         signals = {}
 
         # ── 己方正面 ──────────────────────────────────────────────────────────
         # +N Wall
-        for m in re.finditer(r'\+(\d+)\s*wall', e):
+        for m in hits['wall']:
             signals['wall'] = signals.get('wall', 0) + int(m.group(1))
 
         # +N Tower
-        for m in re.finditer(r'\+(\d+)\s*tower', e):
+        for m in hits['tower']:
             signals['tower'] = signals.get('tower', 0) + int(m.group(1))
 
-        # +N Quarry (己方)
-        for m in re.finditer(r'\+(\d+)\s*quarry', e):
-            signals['production_own'] = signals.get('production_own', 0) + int(m.group(1))
-
-        # +N Magic (己方)
-        for m in re.finditer(r'\+(\d+)\s*magic', e):
-            signals['production_own'] = signals.get('production_own', 0) + int(m.group(1))
-
-        # +N Dungeon (己方)
-        for m in re.finditer(r'\+(\d+)\s*dungeon', e):
-            signals['production_own'] = signals.get('production_own', 0) + int(m.group(1))
+        # +N Quarry / Magic / Dungeon (己方)
+        for key in ('quarry', 'magic', 'dungeon'):
+            for m in hits[key]:
+                signals['production_own'] = signals.get('production_own', 0) + int(m.group(1))
 
         # +N bricks / gems / recruits (单次资源获得)
-        for m in re.finditer(r'\+(\d+)\s*(bricks?|gems?|recruits?|gem)', e):
-            signals['resource_gain'] = signals.get('resource_gain', 0) + int(m.group(1))
-
         # you gain N bricks/gems/recruits
-        for m in re.finditer(r'you gain (\d+)\s*(bricks?|gems?|recruits?)', e):
-            signals['resource_gain'] = signals.get('resource_gain', 0) + int(m.group(1))
-
         # gain N bricks/gems/recruits (不带you)
-        for m in re.finditer(r'(?<!\w)gain (\d+)\s*(bricks?|gems?|recruits?)', e):
-            signals['resource_gain'] = signals.get('resource_gain', 0) + int(m.group(1))
+        for key in ('gain_plus', 'you_gain', 'gain'):
+            for m in hits[key]:
+                signals['resource_gain'] = signals.get('resource_gain', 0) + int(m.group(1))
 
         # Play again
-        if 'play again' in e:
+        if hits['play_again']:
             signals['play_again'] = 1
 
         # draw / discard (手牌调整)
-        if re.search(r'draw \d+ card', e) or re.search(r'discard \d+ card', e):
+        if hits['draw_discard']:
             signals['draw_discard'] = 1
 
         # ── 己方负面 ──────────────────────────────────────────────────────────
-        # you lose N / lose N (己方失去资源) - 注意: 要排?"all players lose" ?"enemy loses" 情况
-        for m in re.finditer(
-            r'(?:you lose|you lose) (\d+)\s*(bricks?|gems?|recruits?)', e
-        ):
+        # you lose N / lose N (己方失去资源) - 注意: 要排除 "all players lose" 和 "enemy loses" 情况
+        for m in hits['you_lose']:
             signals['resource_lose'] = signals.get('resource_lose', 0) - int(m.group(1))
 
         # "lose N gems/bricks/recruits" without "you" prefix but also not "enemy" or "all players"
-        for m in re.finditer(r'(?<![a-z])lose (\d+)\s*(bricks?|gems?|recruits?)', e):
+        for m in hits['lose']:
             pre = e[max(0, m.start()-20):m.start()]
             if 'enemy' not in pre and 'all player' not in pre and 'you' not in pre:
                 signals['resource_lose'] = signals.get('resource_lose', 0) - int(m.group(1))
 
         # lose N production (己方产能削减)
-        for m in re.finditer(r'-(\d+)\s*quarry(?! of | enemy)', e):
-            # 只匹配己?quarry 减少，排?"enemy quarry"
-            # 检查是否是己方
-            context_start = max(0, m.start() - 10)
-            context = e[context_start:m.end()]
+        for m in hits['minus_quarry']:
+            # 只匹配己方 quarry 减少，排除 "enemy quarry"
+            context = e[max(0, m.start() - 10):m.end()]
             if 'enemy' not in context:
                 signals['production_enemy'] = signals.get('production_enemy', 0) - int(m.group(1))
 
-        for m in re.finditer(r'-(\d+)\s*magic(?!\s*\>|\s*=)', e):
-            context_start = max(0, m.start() - 10)
-            context = e[context_start:m.end()]
+        for m in hits['minus_magic']:
+            context = e[max(0, m.start() - 10):m.end()]
             if 'enemy' not in context and 'all' not in context:
                 signals['production_enemy'] = signals.get('production_enemy', 0) - int(m.group(1))
 
-        # -N Wall (己方墙减少，?Crystallize)
-        for m in re.finditer(r'-(\d+)\s*wall', e):
-            context_start = max(0, m.start() - 10)
-            context = e[context_start:m.end()]
+        # -N Wall (己方墙减少，如 Crystallize)
+        for m in hits['minus_wall']:
+            context = e[max(0, m.start() - 10):m.end()]
             if 'enemy' not in context:
                 signals['wall'] = signals.get('wall', 0) - int(m.group(1))
 
         # ── 对敌伤害 ──────────────────────────────────────────────────────────
         # N damage to enemy tower (直接塔伤)
-        for m in re.finditer(r'(\d+)\s*damage to (?:enemy |all )?tower', e):
+        for m in hits['tower_damage']:
             signals['tower_damage'] = signals.get('tower_damage', 0) + int(m.group(1))
 
         # 12 damage to enemy (后面没有 tower 的，判定为普通damage)
-        for m in re.finditer(r'(\d+)\s*damage to enemy(?!\s*tower)', e):
+        for m in hits['enemy_damage']:
             signals['damage'] = signals.get('damage', 0) + int(m.group(1))
 
         # 4 damage to all enemy towers
-        for m in re.finditer(r'(\d+)\s*damage to all enemy towers?', e):
+        for m in hits['all_enemy_towers']:
             signals['tower_damage'] = signals.get('tower_damage', 0) + int(m.group(1))
 
-        # N damage (?to tower/to enemy, 是普通穿墙damage)
-        # 排除已匹配的情况
-        bare_damage = re.findall(r'(\d+)\s*damage(?!\s+to)', e)
-        # 需要确认不?"to your tower" / "you take N damage" (己方受伤)
-        for m in re.finditer(r'(\d+)\s*damage(?!\s+to)', e):
-            # 检查前?
+        # N damage (非 to tower/to enemy, 是普通穿墙damage)
+        # 需要确认不是 "to your tower" / "you take N damage" (己方受伤)
+        for m in hits['bare_damage']:
+            # 检查前文
             pre = e[max(0, m.start()-20):m.start()]
-            if 'your tower take' in pre or 'tower take' in pre:
-                # 己方塔受?
-                signals['tower_damage_self'] = signals.get('tower_damage_self', 0) - int(m.group(1))
-            elif 'you take' in pre or 'you take' in e[max(0,m.start()-10):m.start()]:
+            if 'tower take' in pre or 'you take' in pre:
+                # 己方塔受伤
                 signals['tower_damage_self'] = signals.get('tower_damage_self', 0) - int(m.group(1))
             else:
                 signals['damage'] = signals.get('damage', 0) + int(m.group(1))
 
         # you take N damage / tower take N damage (己方受到伤害)
-        for m in re.finditer(r'(?:you take|tower take[s]?)\s*(\d+)\s*damage', e):
+        for m in hits['you_take']:
             signals['tower_damage_self'] = signals.get('tower_damage_self', 0) - int(m.group(1))
 
-        # ── 对敌方资?产能削减 ──────────────────────────────────────────────
+        # ── 对敌方资源/产能削减 ──────────────────────────────────────────────
         # enemy loses N bricks/gems/recruits
-        for m in re.finditer(r'enemy (?:loses?|lose) (\d+)\s*(bricks?|gems?|recruits?)', e):
+        for m in hits['enemy_lose']:
             signals['resource_enemy_lose'] = signals.get('resource_enemy_lose', 0) + int(m.group(1))
 
-        # 对敌产能削减：用统一的正则，只匹配一次，避免重复
         # 匹配 "-N enemy quarry", "-N enemy dungeon", "enemy loses N quarry"
-        seen_enemy_production_pos = set()
-        for m in re.finditer(
-            r'(?:-(\d+)\s*enemy\s*(quarry|dungeon)'
-            r'|enemy\s+lose[s]?\s+(\d+)\s*(quarry|dungeon))', e
-        ):
-            if m.start() in seen_enemy_production_pos:
-                continue
-            seen_enemy_production_pos.add(m.start())
+        # (单条规则内的匹配互不重叠，同一位置不会被重复计数)
+        for m in hits['enemy_production']:
             val = int(m.group(1) or m.group(3))
             signals['production_enemy_de'] = signals.get('production_enemy_de', 0) + val
 
-        # ── 全玩家效?─────────────────────────────────────────────────────────
+        # ── 全玩家效果 ─────────────────────────────────────────────────────────
         # all players lose N bricks/gems/recruits
-        for m in re.finditer(r'all players? (?:lose|loses) (\d+)\s*(bricks?|gems?|recruits?)', e):
-            # 自己也受影响，净收益:对敌价?0.5) - 己方亏损(0.9)
+        for m in hits['all_lose']:
+            # 自己也受影响，净收益:对敌价值(0.5) - 己方亏损(0.9)
             val = int(m.group(1))
             signals['resource_lose'] = signals.get('resource_lose', 0) - val
             signals['resource_enemy_lose'] = signals.get('resource_enemy_lose', 0) + val
 
-        # all player's quarry -1 (?Earthquake)
-        if re.search(r'all player.{0,5}quarry.{0,5}-1|-1 to all player.{0,5}quarr', e):
+        # all player's quarry -1 (如 Earthquake)
+        if hits['all_quarry_minus']:
             signals['production_enemy'] = signals.get('production_enemy', 0) - 1
             signals['production_enemy_de'] = signals.get('production_enemy_de', 0) + 1
 
-        # all player's dungeon +1 (?Full Moon) - 己方获益，但给了对手
-        if re.search(r'\+1 to all player.{0,10}dungeon', e):
+        # all player's dungeon +1 (如 Full Moon) - 己方获益，但给了对手
+        if hits['all_dungeon_plus']:
             signals['production_own'] = signals.get('production_own', 0) + 1
-            signals['production_enemy_de'] = signals.get('production_enemy_de', 0) - 1  # 给了对手，抵?
+            signals['production_enemy_de'] = signals.get('production_enemy_de', 0) - 1  # 给了对手，抵消
 
         # +1 magic/dungeon/quarry to all
-        if re.search(r'\+1 to all player.{0,10}quarry', e):
+        if hits['all_quarry_plus']:
             signals['production_own'] = signals.get('production_own', 0) + 1
             signals['production_enemy_de'] = signals.get('production_enemy_de', 0) - 1
 
         # 7 damage to all towers
-        for m in re.finditer(r'(\d+)\s*damage to all tower', e):
+        for m in hits['all_towers_damage']:
             signals['damage'] = signals.get('damage', 0) + int(m.group(1))
             signals['tower_damage_self'] = signals.get('tower_damage_self', 0) - int(m.group(1))
 
         # ── 条件效果修正 ──────────────────────────────────────────────────────
         # 条件大小伤害：if ... N damage ... else M damage
-        # 由于上面的裸 damage 正则已将两分支都累加进去，这里修正为平均?
-        m = re.search(r'if.+?(\d+)\s*damage.+?else\s*(\d+)\s*damage', e)
-        if m:
+        # 裸 damage 规则已将两个分支都累加进 damage，这里清空并重设为平均值
+        # (条件伤害不涉及己方受伤，tower_damage_self / tower_damage 保持不变)
+        for m in hits['conditional_damage']:
             v1, v2 = int(m.group(1)), int(m.group(2))
-            avg = (v1 + v2) / 2
-            # 上面已经?v1 ?v2 都加?damage，需要减去多余的重算
-            # 实际上裸 damage 匹配已经累加了两个值，?"else M damage" ?M 不会?
-            # bare_damage 匹配（因?else 后的 damage 仍被 r'(\d+)\s*damage(?!\s+to)' 匹配?
-            # 清空 damage 并重设为平均?
-            signals['damage'] = avg
-            # 同理清空可能误计?tower_damage_self ?tower_damage
-            # (条件伤害不涉及己方受伤，保持不变)
-
-        # if quarry < enemy quarry, quarry = enemy quarry -> 期望?1.5产能
-        if 'quarry = enemy quarry' in e:
+            signals['damage'] = (v1 + v2) / 2
+
+        # if quarry < enemy quarry, quarry = enemy quarry -> 期望约 1.5产能
+        if hits['quarry_equals']:
             signals['production_own'] = signals.get('production_own', 0) + 1.5
 
         return signals
 
 
+def card_signals(card: dict, parser: 'EffectParser') -> dict:
+    """卡牌的信号字典；card_ir 编译出的 IR 条目自带 signals，直接取用而不解析效果文本。"""
+    if 'signals' in card:
+        return dict(card['signals'])
+    return parser.parse(card.get('effect', ''))
+
+
 # ─── 战力计算引擎 ──────────────────────────────────────────────────────────────
 class CardScorer:
     def __init__(self, weights=None):
@@ -249,9 +333,9 @@ class CardScorer:
     def score(self, card: dict) -> dict:
         cost = card.get('cost', 0)
         effect = card.get('effect', '')
-        signals = self.parser.parse(effect)
+        signals = card_signals(card, self.parser)
 
-        # --- 计算各部分得?---
+        # --- 计算各部分得分 ---
         base_input = self.w['action_cost'] + cost * self.w['resource_cost']
 
         output = 0
@@ -264,13 +348,13 @@ class CardScorer:
                     breakdown[key] = round(pts, 2)
                 output += pts
 
-        # 高费溢价 (费用 > 6 的卡，每1费额?+0.08)
+        # 高费溢价 (费用 > 6 的卡，每1费额外 +0.08)
         if cost > 6:
             premium = (cost - 6) * self.w['high_cost_premium']
             breakdown['high_cost_premium'] = round(premium, 2)
             output += premium
 
-        # 己方塔受?
+        # 己方塔受伤
         if 'tower_damage_self' in signals:
             pts = signals['tower_damage_self'] * self.w['tower_damage']
             breakdown['tower_damage_self (tower取负)'] = round(pts, 2)
@@ -292,8 +376,418 @@ class CardScorer:
         }
 
 
-# ─── 输出格式?───────────────────────────────────────────────────────────────
+# ─── 批量打分 (NumPy) ─────────────────────────────────────────────────────────
+# 信号矩阵的列顺序与 WEIGHTS 的键顺序一致，一行对应一张卡
+SIGNAL_COLUMNS = list(WEIGHTS)
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("batch scoring requires numpy (pip install numpy)") from None
+    return numpy
+
+
+def signal_terms(card: dict, parser: EffectParser = None) -> list:
+    """
+    按 CardScorer.score() 的累加顺序列出一张卡的 (信号维度, 数值) 输出项，
+    不含 action_cost / resource_cost 两项输入成本。
+    """
+    parser = parser or EffectParser()
+    cost = card.get('cost', 0)
+    signals = card_signals(card, parser)
+    terms = [(key, val) for key, val in signals.items() if key in WEIGHTS]
+    # 高费溢价: 费用 > 6 的部分
+    if cost > 6:
+        terms.append(('high_cost_premium', cost - 6))
+    # 己方塔受伤按 tower_damage 权重计分 (取负)
+    if 'tower_damage_self' in signals:
+        terms.append(('tower_damage', signals['tower_damage_self']))
+    return terms
+
+
+def signal_row(card: dict, parser: EffectParser = None) -> list:
+    """
+    把一张卡展开为与 SIGNAL_COLUMNS 对齐的特征行，满足
+    CardScorer(weights).score(card)['net_value'] == round(row · weights, 2)。
+    """
+    row = dict.fromkeys(SIGNAL_COLUMNS, 0)
+    row['action_cost'] = 1
+    row['resource_cost'] = card.get('cost', 0)
+    for key, val in signal_terms(card, parser):
+        row[key] += val
+    return [row[k] for k in SIGNAL_COLUMNS]
+
+
+def weight_vector(weights: dict):
+    """把 WEIGHTS 风格的字典转换为与 SIGNAL_COLUMNS 对齐的向量。"""
+    np = _require_numpy()
+    return np.array([weights[k] for k in SIGNAL_COLUMNS], dtype=float)
+
+
+class SignalMatrix:
+    """
+    整副卡组的 (卡牌 × 信号维度) 稠密矩阵，只解析一次。
+    任意多组权重的净价值由一次矩阵乘法得出:  net = W @ X.T
+    """
+
+    def __init__(self, cards: list, parser: EffectParser = None):
+        np = _require_numpy()
+        parser = parser or EffectParser()
+        self.cards = cards
+        self.columns = SIGNAL_COLUMNS
+        self.X = np.array([signal_row(c, parser) for c in cards], dtype=float).reshape(
+            len(cards), len(SIGNAL_COLUMNS))
+        # 逐卡输出项，仅用于舍入边界上的精确复算
+        col = {k: i for i, k in enumerate(SIGNAL_COLUMNS)}
+        self._terms = [[(col[k], v) for k, v in signal_terms(c, parser)] for c in cards]
+
+    def net_values(self, weights, decimals: int = 2):
+        """
+        weights 可以是 WEIGHTS 风格的字典、一维权重向量，或 (组数 × 维度) 的二维数组。
+        返回一维 (卡牌,) 或二维 (组数 × 卡牌) 的净价值。
+        decimals 不为 None 时按 score() 的方式舍入，结果与逐卡打分逐位一致。
+        """
+        np = _require_numpy()
+        if isinstance(weights, dict):
+            weights = weight_vector(weights)
+        W = np.asarray(weights, dtype=float)
+        net = W @ self.X.T
+        if decimals is None:
+            return net
+        rounded = np.round(net, decimals)
+        # 矩阵乘法与逐项累加的浮点误差只会在 x.xx5 这类舍入边界上改变结果，
+        # 这些位置按 score() 的累加顺序用 Python round() 复算
+        scaled = net * 10.0 ** decimals
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        if near_tie.any():
+            W2, out, ties = np.atleast_2d(W), np.atleast_2d(rounded), np.atleast_2d(near_tie)
+            for j in np.flatnonzero(ties.any(axis=0)):
+                rows = np.flatnonzero(ties[:, j])
+                exact = self._ordered_net(j, W2[rows])
+                out[rows, j] = [round(float(x), decimals) for x in exact]
+        return rounded
+
+    def _ordered_net(self, j: int, W):
+        """按 score() 的顺序逐项累加第 j 张卡在多组权重下的未舍入净价值。"""
+        ac, rc = SIGNAL_COLUMNS.index('action_cost'), SIGNAL_COLUMNS.index('resource_cost')
+        base_input = W[:, ac] + self.cards[j].get('cost', 0) * W[:, rc]
+        output = 0
+        for col, val in self._terms[j]:
+            output = output + val * W[:, col]
+        return base_input + output
+
+
+# ─── 权重拟合 (模拟对局) ───────────────────────────────────────────────────────
+# 每次出牌记一条样本: 特征为该卡的信号行，目标为出牌方最终是否获胜相对平均出牌胜率的差值。
+# 同一张卡的样本特征相同，因此每个模拟分片只需按卡汇总 (出场次数, 出牌方获胜次数)
+# 即可把该分片并入正规方程，内存只与卡牌数有关，与对局数无关。
+FIT_GAMES = 20000
+
+
+class OnlineLeastSquares:
+    """
+    增量 (加权) 最小二乘: 只累加正规方程 XᵀWX 与 XᵀWy，样本可分批流入。
+    """
+
+    def __init__(self, dim: int):
+        np = _require_numpy()
+        self.xtx = np.zeros((dim, dim))
+        self.xty = np.zeros(dim)
+        self.samples = 0.0
+        self.ysum = 0.0
+
+    def update(self, X, y, weights=None):
+        """并入一批样本；weights 为每行的样本权重 (例如重复次数)。"""
+        np = _require_numpy()
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        w = np.ones(len(X)) if weights is None else np.asarray(weights, dtype=float)
+        self.xtx += (X * w[:, None]).T @ X
+        self.xty += X.T @ (w * y)
+        self.samples += w.sum()
+        self.ysum += float(w @ y)
+
+    def solve(self, ridge: float = 1e-9):
+        """
+        返回 (系数, 有效列掩码)。从未出现过非零值的列无法识别，系数置 0 并在掩码中标为 False。
+        """
+        np = _require_numpy()
+        seen = np.diag(self.xtx) > 0
+        idx = np.flatnonzero(seen)
+        A = self.xtx[np.ix_(idx, idx)]
+        beta = np.zeros(len(self.xty))
+        beta[idx] = np.linalg.solve(A + ridge * np.trace(A) * np.eye(len(idx)), self.xty[idx])
+        return beta, seen
+
+
+def fit_weights(cards: list, games: int = FIT_GAMES, seed: int = None, workers: int = 1,
+                parser: EffectParser = None, on_progress=None) -> dict:
+    """
+    用模拟对局拟合信号维度的权重。
+
+    回归目标是出牌方胜率相对平均出牌胜率的差值 (胜率增量)，
+    返回的 'win_rate' 为每单位信号对这一增量的边际贡献 (回归系数)；
+    action_cost 列恒为 1，其系数即回归截距: 零信号、零费用的卡相对平均出牌的胜率增量。
+    'weights' 为把全部系数 (含截距) 按同一系数缩放到 WEIGHTS 分值尺度后的结果，
+    因此拟合权重下 净值 > 0 即"预测胜率高于平均出牌"。
+    'classes' 对比当前与拟合权重下 超模/平衡/战略 三类的卡数 (阈值与报告一致)。
+    """
+    np = _require_numpy()
+    from card_simulator import run_many
+
+    X = SignalMatrix(cards, parser).X
+    ols = OnlineLeastSquares(len(SIGNAL_COLUMNS))
+
+    def absorb(part):
+        plays = np.asarray(part['card_plays'], dtype=float)
+        wins = np.asarray(part['card_wins'], dtype=float)
+        played = plays > 0
+        ols.update(X[played], wins[played] / plays[played], weights=plays[played])
+
+    tally = run_many(cards, games, seed=seed, workers=workers,
+                     on_progress=on_progress, on_shard=absorb)
+    beta, seen = ols.solve()
+    # 以 0/1 胜负为目标解出的回归与以"胜负 - 平均胜率"为目标的回归只差一个常数，
+    # 而 action_cost 列恒为 1，所以只需从截距中减去平均出牌胜率
+    ac = SIGNAL_COLUMNS.index('action_cost')
+    mean_win = ols.ysum / ols.samples
+    beta[ac] -= mean_win
+
+    # 缩放到手调权重的尺度: 取使 |s·beta - WEIGHTS| 最小的 s (只在可识别的列上匹配)，
+    # 截距用同一系数缩放，保持各项与截距的相对大小
+    hand = weight_vector(WEIGHTS)
+    scale = float(beta[seen] @ hand[seen] / (beta[seen] @ beta[seen]))
+    fitted = np.where(seen, beta * scale, hand)
+    weights = {k: round(float(w), 3) for k, w in zip(SIGNAL_COLUMNS, fitted)}
+
+    matrix = SignalMatrix(cards, parser)
+    classes = {}
+    for label, W in (('current', WEIGHTS), ('fitted', weights)):
+        counts = np.bincount(classify(matrix.net_values(W)), minlength=len(CLASSES))
+        classes[label] = dict(zip(CLASSES, (int(n) for n in counts)))
+    return {
+        'games': tally['games'],
+        'seed': tally['seed'],
+        'plays': int(ols.samples),
+        'mean_win_rate': mean_win,
+        'scale': scale,
+        'win_rate': {k: float(b) for k, b in zip(SIGNAL_COLUMNS, beta)},
+        'weights': weights,
+        'fitted': [k for k, m in zip(SIGNAL_COLUMNS, seen) if m],
+        'classes': classes,
+    }
+
+
+def print_fit(fit: dict):
+    print(f"\n{'='*70}")
+    print(f"  [FIT] Weights fitted from {fit['games']} simulated games "
+          f"({fit['plays']} plays, seed {fit['seed']})")
+    print(f"{'='*70}")
+    print(f"  {'Signal':<22}  {'Current':>8}  {'dWin%/unit':>10}  {'Fitted':>8}")
+    print(f"  {'-'*54}")
+    for key in SIGNAL_COLUMNS:
+        win = f"{fit['win_rate'][key] * 100:+10.3f}" if key in fit['fitted'] else f"{'-':>10}"
+        print(f"  {key:<22}  {WEIGHTS[key]:>+8.2f}  {win}  {fit['weights'][key]:>+8.3f}")
+    print(f"\n  dWin% is the change in the player's win probability relative to an average play")
+    print(f"  ({fit['mean_win_rate']:.1%} wins); action_cost is the intercept (a zero-signal, zero-cost card).")
+    print(f"  Fitted values are all coefficients x {fit['scale']:.1f} (best match to current scale),")
+    print("  so a fitted net value > 0 means an above-average predicted win rate.")
+    print(f"\n  {'Class':<12} {'Current':>8} {'Fitted':>8}   (overtuned: net > 0, strategic: net < -5)")
+    for cls in CLASSES:
+        print(f"  {cls:<12} {fit['classes']['current'][cls]:>8} {fit['classes']['fitted'][cls]:>8}")
+    shifted = [cls for cls in CLASSES if fit['classes']['current'][cls] != fit['classes']['fitted'][cls]]
+    if shifted:
+        print(f"  The report's fixed thresholds reclassify cards under the fitted scale ({', '.join(shifted)});")
+        print("  the values below are a starting point, not a drop-in replacement.")
+    print("\n  Fitted weights in WEIGHTS format (review the class counts above before adopting):")
+    for key, val in fit['weights'].items():
+        print(f"    {json.dumps(key) + ':':<24} {val:+.3f},")
+
+
+# ─── 权重敏感性扫描 (--sweep) ─────────────────────────────────────────────────
+# 每个权重给出取值区间，按网格或拉丁超立方抽样生成多组权重，在进程池中批量打分。
+# 信号矩阵只在主进程解析一次，通过进程池 initializer 发给每个工作进程一次，
+# 各工作进程按块计算 (配置 × 卡牌) 的净价值与名次，只回传逐卡的汇总统计。
+SWEEP_CHUNK = 2000
+CLASSES = ('overtuned', 'balanced', 'strategic')
+
+
+def parse_sweep_spec(spec: str) -> tuple:
+    """'play_again=1:3:5' -> ('play_again', 1.0, 3.0, 5)；省略点数时 (用于抽样) 为 None。"""
+    name, _, rng = spec.partition('=')
+    name = name.strip()
+    if name not in WEIGHTS:
+        raise ValueError(f"unknown weight '{name}' (choose from: {', '.join(WEIGHTS)})")
+    parts = rng.split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError(f"bad sweep range '{spec}', expected name=lo:hi or name=lo:hi:steps")
+    try:
+        lo, hi = float(parts[0]), float(parts[1])
+        steps = int(parts[2]) if len(parts) == 3 else None
+    except ValueError:
+        raise ValueError(f"bad sweep range '{spec}', bounds must be numbers and steps an integer") from None
+    if steps is not None and steps < 1:
+        raise ValueError(f"bad sweep range '{spec}', steps must be at least 1")
+    return name, lo, hi, steps
+
+
+def sweep_configs(specs: list, samples: int = None, seed: int = 0, base: dict = None):
+    """
+    生成 (配置数 × 维度) 的权重矩阵，未参与扫描的维度取 base (默认 WEIGHTS) 的值。
+    samples 为 None 时做全网格 (每个区间需给出点数)，否则做 samples 点的拉丁超立方抽样。
+    """
+    np = _require_numpy()
+    if samples is not None and samples < 1:
+        raise ValueError("--samples must be at least 1")
+    base = weight_vector(base or WEIGHTS)
+    cols = [SIGNAL_COLUMNS.index(name) for name, _, _, _ in specs]
+    if samples is None:
+        if any(steps is None for _, _, _, steps in specs):
+            raise ValueError("grid sweeps need a step count for every range (name=lo:hi:steps)")
+        axes = [np.linspace(lo, hi, steps) for _, lo, hi, steps in specs]
+        values = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(specs))
+    else:
+        rng = np.random.default_rng(seed)
+        strata = np.stack([rng.permutation(samples) for _ in specs], axis=1)
+        u = (strata + rng.random((samples, len(specs)))) / samples
+        lo = np.array([lo for _, lo, _, _ in specs])
+        hi = np.array([hi for _, _, hi, _ in specs])
+        values = lo + u * (hi - lo)
+    W = np.tile(base, (len(values), 1))
+    W[:, cols] = values
+    return W
+
+
+def classify(net):
+    """与报告一致: 净值 > 0 为超模 (0)，< -5 为战略卡 (2)，其余为平衡 (1)。"""
+    np = _require_numpy()
+    return np.where(net > 0, 0, np.where(net < -5, 2, 1))
+
+
+def rank_matrix(net):
+    """每行 (一组权重) 的名次，从 1 开始；同分按卡组顺序，与 main() 的稳定排序一致。"""
+    np = _require_numpy()
+    order = np.argsort(-net, axis=-1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, net.shape[-1] + 1), axis=-1)
+    return ranks
+
+
+def _sweep_chunk(matrix: SignalMatrix, W) -> dict:
+    np = _require_numpy()
+    net = matrix.net_values(W)
+    ranks = rank_matrix(net)
+    cls = classify(net)
+    return {
+        'configs': len(W),
+        'rank_sum': ranks.sum(axis=0).astype(float),
+        'rank_sq': (ranks.astype(float) ** 2).sum(axis=0),
+        'rank_min': ranks.min(axis=0),
+        'rank_max': ranks.max(axis=0),
+        'class_counts': np.stack([(cls == k).sum(axis=0) for k in range(len(CLASSES))], axis=1),
+    }
+
+
+def _merge_sweep(into: dict, part: dict) -> dict:
+    np = _require_numpy()
+    if not into:
+        return part
+    into['configs'] += part['configs']
+    for key in ('rank_sum', 'rank_sq', 'class_counts'):
+        into[key] = into[key] + part[key]
+    into['rank_min'] = np.minimum(into['rank_min'], part['rank_min'])
+    into['rank_max'] = np.maximum(into['rank_max'], part['rank_max'])
+    return into
+
+
+# 工作进程内的信号矩阵 (由 initializer 设置一次)
+_SWEEP_MATRIX = None
+
+
+def _init_sweep_worker(matrix: SignalMatrix):
+    global _SWEEP_MATRIX
+    _SWEEP_MATRIX = matrix
+
+
+def _sweep_chunk_in_worker(W) -> dict:
+    return _sweep_chunk(_SWEEP_MATRIX, W)
+
+
+def run_sweep(cards: list, W, workers: int = 1, chunk: int = SWEEP_CHUNK, on_progress=None) -> list:
+    """
+    对权重矩阵 W 的每一行打分排名，返回逐卡的稳定性统计 (按卡组顺序):
+    基准名次/分类 (当前 WEIGHTS)、名次的最小/最大/均值/标准差、各分类占比、分类翻转率。
+    """
+    import multiprocessing
+    np = _require_numpy()
+    matrix = SignalMatrix(cards)
+    chunks = [W[i:i + chunk] for i in range(0, len(W), chunk)]
+    total = {}
+    if workers <= 1 or len(chunks) <= 1:
+        parts = (_sweep_chunk(matrix, c) for c in chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(chunks)), initializer=_init_sweep_worker,
+                                    initargs=(matrix,))
+        parts = pool.imap_unordered(_sweep_chunk_in_worker, chunks)
+    try:
+        for part in parts:
+            total = _merge_sweep(total, part)
+            if on_progress:
+                on_progress(total['configs'], len(W))
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    base_net = matrix.net_values(WEIGHTS)
+    base_rank = rank_matrix(base_net)
+    base_cls = classify(base_net)
+    n = total['configs']
+    mean = total['rank_sum'] / n
+    std = np.sqrt(np.maximum(total['rank_sq'] / n - mean ** 2, 0))
+    report = []
+    for j, card in enumerate(cards):
+        shares = total['class_counts'][j] / n
+        report.append({
+            'id': card['id'],
+            'name': card['name'],
+            'color': card['color'],
+            'base_rank': int(base_rank[j]),
+            'base_net': float(base_net[j]),
+            'base_class': CLASSES[base_cls[j]],
+            'rank_min': int(total['rank_min'][j]),
+            'rank_max': int(total['rank_max'][j]),
+            'rank_mean': round(float(mean[j]), 2),
+            'rank_std': round(float(std[j]), 2),
+            'class_share': {c: round(float(x), 4) for c, x in zip(CLASSES, shares)},
+            'class_flip_rate': round(float(1 - shares[base_cls[j]]), 4),
+        })
+    return report
+
+
+def print_sweep(report: list, configs: int, top_n: int = 20):
+    print(f"\n{'='*70}")
+    print(f"  [SWEEP] Ranking stability over {configs} weight configurations")
+    print(f"{'='*70}")
+    print(f"  {'Card Name':<24} {'Base':>4} {'Min':>4} {'Max':>4} {'Mean':>6} {'Std':>5}  "
+          f"{'Class':<10} {'Flip':>6}")
+    print(f"  {'-'*68}")
+    for r in sorted(report, key=lambda r: (-r['rank_std'], r['base_rank']))[:top_n]:
+        mk = COLOR_MARK.get(r['color'], '[ ]')
+        print(f"  {mk} {r['name']:<20} {r['base_rank']:>4} {r['rank_min']:>4} {r['rank_max']:>4} "
+              f"{r['rank_mean']:>6.1f} {r['rank_std']:>5.1f}  {r['base_class']:<10} {r['class_flip_rate']:>6.1%}")
+    flips = [r for r in report if r['class_flip_rate'] > 0]
+    print(f"\n  {len(flips)} of {len(report)} cards change classification in at least one configuration.")
+    for r in sorted(flips, key=lambda r: -r['class_flip_rate'])[:top_n]:
+        shares = ', '.join(f"{c} {x:.1%}" for c, x in r['class_share'].items() if x)
+        print(f"    {r['name']:<24} base {r['base_class']:<10} -> {shares}")
+
+
+# ─── 输出格式化 ───────────────────────────────────────────────────────────────
 COLOR_MARK = {'Red': '[R]', 'Blue': '[B]', 'Green': '[G]'}
+COLORS = list(COLOR_MARK)
 
 def print_table(results: list, title: str, top_n: int = None):
     data = results[:top_n] if top_n else results
@@ -324,36 +818,21 @@ def print_detail(result: dict):
     print(f"  = Net Value: {result['net_value']:+.2f} pt  [{label}]")
 
 
-# ─── 主函?───────────────────────────────────────────────────────────────────
-def main():
-    # 找到 cards.json 路径 (工具脚本?tools/ 下，cards.json ?src/ ?
-    script_dir = Path(__file__).parent
-    cards_path = script_dir.parent / 'src' / 'cards.json'
-
-    if not cards_path.exists():
-        print(f"[ERROR] cards.json not found: {cards_path}")
-        return
-
-    with open(cards_path, encoding='utf-8') as f:
-        cards = json.load(f)
+def print_ranking(results: list, colors=None):
+    """colors 为 None 时 results 是整副卡组，否则是按这些颜色筛选后的结果。"""
+    label = '+'.join(colors) if colors else 'ALL'
+    kind = 'Card Power Ranking' if colors else 'Full Card Power Ranking'
+    print_table(results, f"[{label}] {kind} (by Net Value desc)")
 
-    print(f"[OK] Loaded {len(cards)} cards from cards.json")
-
-    scorer = CardScorer()
-    results = [scorer.score(c) for c in cards]
 
-    # 按净价值从高到低排?
-    results.sort(key=lambda x: x['net_value'], reverse=True)
-
-    # ── 全榜输出 ──
-    print_table(results, "[ALL] Full Card Power Ranking (by Net Value desc)")
-
-    # ── 分色?──
-    for color in ['Red', 'Blue', 'Green']:
+def print_color_tables(results: list, colors=COLORS, top_n: int = 15):
+    for color in colors:
         color_results = [r for r in results if r['color'] == color]
-        print_table(color_results, f"{COLOR_MARK[color]} {color} Deck Power Ranking", top_n=15)
+        print_table(color_results, f"{COLOR_MARK[color]} {color} Deck Power Ranking", top_n=top_n)
 
-    # ── 超模?(净?> 0) ──
+
+def print_overtuned(results: list):
+    # 超模卡 (净值 > 0)
     overtuned = [r for r in results if r['net_value'] > 0]
     if overtuned:
         print(f"\n{'='*70}")
@@ -362,7 +841,9 @@ def main():
         for r in overtuned:
             print_detail(r)
 
-    # ── 战略?(净?< -5) ──
+
+def print_strategic(results: list):
+    # 战略卡 (净值 < -5)
     strategic = [r for r in results if r['net_value'] < -5]
     strategic.sort(key=lambda x: x['net_value'])
     print(f"\n{'='*70}")
@@ -373,7 +854,9 @@ def main():
         mk = COLOR_MARK.get(r['color'], '')
         print(f"    {mk} {r['name']:<24} ({r['name_zh']})  net: {r['net_value']:+.2f}  -> {r['effect']}")
 
-    # ── 费效?净?费用) ──
+
+def print_efficiency(results: list):
+    # 费效比 (净值/费用)
     print(f"\n{'='*70}")
     print(f"  [EFFICIENCY] Net Value / Cost  (0-cost cards excluded)")
     print(f"{'='*70}")
@@ -388,35 +871,15 @@ def main():
     for r in ratio_results[-10:]:
         print(f"    {COLOR_MARK.get(r['color'],'')} {r['name']:<24} net:{r['net_value']:+.2f} / {r['cost']}c = ratio:{r['ratio']:+.2f}")
 
-    # ── 导出 JSON ──
-    output_path = script_dir / 'card_power_results.json'
-    export = [
-        {
-            'rank': i+1,
-            'id':   r['id'],
-            'name': r['name'],
-            'name_zh': r['name_zh'],
-            'color': r['color'],
-            'cost': r['cost'],
-            'effect': r['effect'],
-            'net_value': r['net_value'],
-            'input_pts': r['input_pts'],
-            'output_pts': r['output_pts'],
-            'breakdown': r['breakdown'],
-        }
-        for i, r in enumerate(results)
-    ]
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(export, f, ensure_ascii=False, indent=2)
-    print(f"\n[DONE] Full results exported to: {output_path}")
 
-    # ── 权重调整提示 ──
+def print_calibration(results: list = None):
     print(f"""
 {'='*70}
   HOW TO CALIBRATE THE MODEL:
 {'='*70}
   1. Review the rankings above.
-     If a card you consider strong ranks too low, tell the AI to adjust weights.
+     If a card you consider strong ranks too low, tell the AI to adjust weights,
+     or run with --fit to estimate them from simulated games.
   2. Tunable parameters (WEIGHTS dict at top of this file):
      - production_own / production_enemy_de  : value of building/destroying production
      - play_again                            : value of extra turn
@@ -425,5 +888,557 @@ def main():
 """)
 
 
+# 报告各节 (--section)，按完整报告中的顺序排列
+REPORT_SECTIONS = {
+    'ranking':    print_ranking,
+    'colors':     print_color_tables,
+    'overtuned':  print_overtuned,
+    'strategic':  print_strategic,
+    'efficiency': print_efficiency,
+    'calibrate':  print_calibration,
+}
+
+
+# 标题或分表依赖所选颜色的节；其余各节只看传入的 results
+_COLOR_SECTIONS = {'ranking', 'colors'}
+
+
+def print_report(results: list, sections=None, colors=None):
+    """
+    按顺序打印所选各节 (默认为 calibrate 之外的全部；results 已按净价值降序排列)。
+    colors 为 --color 选中的颜色 (results 已按其筛选)，传给排行与分色两节。
+    """
+    for name in sections or [k for k in REPORT_SECTIONS if k != 'calibrate']:
+        if colors and name in _COLOR_SECTIONS:
+            REPORT_SECTIONS[name](results, colors)
+        else:
+            REPORT_SECTIONS[name](results)
+
+
+def export_results(results: list, f):
+    """把排好序的结果以 card_power_results.json 的格式写入文件对象 f。"""
+    export = [export_entry(i + 1, r) for i, r in enumerate(results)]
+    json.dump(export, f, ensure_ascii=False, indent=2)
+
+
+def rank_cards(cards: list) -> list:
+    """对整副卡组打分，按净价值从高到低排序。"""
+    scorer = CardScorer()
+    return sorted((scorer.score(c) for c in cards), key=lambda x: x['net_value'], reverse=True)
+
+
+def export_full(results: list, output_path: Path):
+    """写出整副卡组的结果 JSON；results 为 rank_cards 的结果 (不能是按颜色筛选后的子集)。"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        export_results(results, f)
+    print(f"\n[DONE] Full results exported to: {output_path}")
+
+
+def export_binary(results: list, output_path: Path):
+    """写出整副卡组的列式二进制结果 (card_power_columns 格式)，与 export_full 同样要求完整结果。"""
+    from card_power_columns import write_columns
+    # breakdown 列固定按 WEIGHTS 顺序，不随本次结果里出现哪些键而变
+    keys = [k for k in WEIGHTS if k not in ('action_cost', 'resource_cost')]
+    keys += [k for r in results for k in r['breakdown'] if k not in keys]
+    write_columns(output_path, results, list(dict.fromkeys(keys)))
+    print(f"[DONE] Columnar results exported to: {output_path}")
+
+
+# ─── 增量分析 (--watch) ───────────────────────────────────────────────────────
+# 缓存文件按卡牌 id 记录效果 JSON 的内容哈希与上次的打分结果；
+# 权重或解析规则变化时指纹改变，整个缓存失效。
+CACHE_PATH = Path(__file__).parent / '.card_power_cache.json'
+CACHE_VERSION = 1
+
+
+def card_hash(card: dict) -> str:
+    import hashlib
+    return hashlib.sha1(json.dumps(card, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def model_fingerprint(weights: dict) -> str:
+    import hashlib
+    payload = json.dumps([CACHE_VERSION, weights, _RULES], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def export_entry(rank: int, r: dict) -> dict:
+    """card_power_results.json 中的一条记录 (rank 从 1 开始)。"""
+    return {
+        'rank': rank,
+        'id':   r['id'],
+        'name': r['name'],
+        'name_zh': r['name_zh'],
+        'color': r['color'],
+        'cost': r['cost'],
+        'effect': r['effect'],
+        'net_value': r['net_value'],
+        'input_pts': r['input_pts'],
+        'output_pts': r['output_pts'],
+        'breakdown': r['breakdown'],
+    }
+
+
+class Ranking:
+    """
+    按净价值降序的排行榜，与 main() 的稳定排序一致: 键为 (-net_value, 卡组中的位置)。
+    单张卡的分数变化通过二分删除 + 插入完成，不做整体重排。
+    """
+
+    def __init__(self, results: list):
+        self.results = list(results)           # 按卡组位置
+        self.keys = sorted(self._key(i) for i in range(len(self.results)))
+
+    def _key(self, pos: int) -> tuple:
+        return (-self.results[pos]['net_value'], pos)
+
+    def rank_of(self, pos: int) -> int:
+        return bisect.bisect_left(self.keys, self._key(pos))
+
+    def replace(self, pos: int, result: dict) -> tuple:
+        """更新第 pos 张卡的结果，返回 (旧名次, 新名次)，名次从 0 开始。"""
+        old = self.rank_of(pos)
+        del self.keys[old]
+        self.results[pos] = result
+        key = self._key(pos)
+        new = bisect.bisect_left(self.keys, key)
+        self.keys.insert(new, key)
+        return old, new
+
+    def ordered(self) -> list:
+        return [self.results[pos] for _, pos in self.keys]
+
+    def __getitem__(self, rank: int) -> dict:
+        return self.results[self.keys[rank][1]]
+
+
+class ResultsFile:
+    """
+    card_power_results.json 的分块写入器，输出与 json.dump(export, indent=2) 逐字节相同。
+    每个名次的记录单独序列化并缓存；名次区间 [lo, hi] 变化时只重新序列化这些记录，
+    并从第 lo 条记录的字节偏移处改写文件尾部。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.chunks = []
+
+    @staticmethod
+    def _encode(rank: int, r: dict) -> bytes:
+        text = json.dumps(export_entry(rank + 1, r), ensure_ascii=False, indent=2)
+        # 与文本模式 open() 的换行转换保持一致
+        return ('  ' + text.replace('\n', '\n  ')).replace('\n', os.linesep).encode('utf-8')
+
+    def _layout(self):
+        nl = os.linesep.encode()
+        return b'[' + nl, b',' + nl, nl + b']'
+
+    def write(self, ranking: Ranking):
+        self.chunks = [self._encode(i, ranking[i]) for i in range(len(ranking.keys))]
+        head, sep, tail = self._layout()
+        with open(self.path, 'wb') as f:
+            f.write(head + sep.join(self.chunks) + tail if self.chunks else b'[]')
+
+    def patch(self, ranking: Ranking, lo: int, hi: int):
+        if not self.chunks:
+            return self.write(ranking)
+        for i in range(lo, hi + 1):
+            self.chunks[i] = self._encode(i, ranking[i])
+        head, sep, tail = self._layout()
+        offset = len(head) + sum(len(c) for c in self.chunks[:lo]) + len(sep) * lo
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            f.write(sep.join(self.chunks[lo:]) + tail)
+            f.truncate()
+
+
+class IncrementalAnalysis:
+    """
+    增量重算: 只对内容哈希变化的卡重新解析打分，更新排行并修补结果文件。
+    卡牌增删或调换顺序时退回整体重建 (仍复用缓存中未变化卡的结果)。
+    """
+
+    def __init__(self, cards_path: Path, results_path: Path, cache_path: Path = CACHE_PATH,
+                 weights: dict = None):
+        self.cards_path = cards_path
+        self.cache_path = cache_path
+        self.scorer = CardScorer(weights)
+        self.fingerprint = model_fingerprint(self.scorer.w)
+        self.out = ResultsFile(results_path)
+        self.ids, self.hashes, self.ranking = [], [], None
+
+    def _load_cards(self) -> list:
+        with open(self.cards_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cache.get('fingerprint') != self.fingerprint:
+            return {}
+        return cache.get('cards', {})
+
+    def _save_cache(self):
+        entries = {cid: {'hash': h, 'result': r}
+                   for cid, h, r in zip(self.ids, self.hashes, self.ranking.results)}
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'cards': entries}, f, ensure_ascii=False)
+
+    def build(self, cards: list = None) -> int:
+        """(重新) 建立全部状态并完整写出结果文件，返回实际重新打分的卡数。"""
+        cards = self._load_cards() if cards is None else cards
+        cache = self._load_cache()
+        results, rescored = [], 0
+        self.ids = [c['id'] for c in cards]
+        self.hashes = [card_hash(c) for c in cards]
+        for card, h in zip(cards, self.hashes):
+            hit = cache.get(card['id'])
+            if hit and hit['hash'] == h:
+                results.append(hit['result'])
+            else:
+                results.append(self.scorer.score(card))
+                rescored += 1
+        self.ranking = Ranking(results)
+        self.out.write(self.ranking)
+        self._save_cache()
+        return rescored
+
+    def refresh(self) -> list:
+        """
+        重新读取 cards.json，返回变化列表 [(新结果, 旧净值, 旧名次, 新名次), ...]，名次从 0 开始。
+        卡组结构变化 (增删/换序) 时整体重建并返回 None。
+        """
+        cards = self._load_cards()
+        if [c['id'] for c in cards] != self.ids:
+            self.build(cards)
+            return None
+        changes = []
+        lo, hi = len(cards), -1
+        for pos, card in enumerate(cards):
+            h = card_hash(card)
+            if h == self.hashes[pos]:
+                continue
+            self.hashes[pos] = h
+            old_net = self.ranking.results[pos]['net_value']
+            result = self.scorer.score(card)
+            old, new = self.ranking.replace(pos, result)
+            changes.append((result, old_net, old, new))
+            lo, hi = min(lo, old, new), max(hi, old, new)
+        if changes:
+            self.out.patch(self.ranking, lo, hi)
+            self._save_cache()
+        return changes
+
+
+def watch(cards_path: Path, results_path: Path, interval: float = 0.5):
+    """轮询 cards.json，变化时增量重算并只打印受影响的卡。Ctrl+C 退出。"""
+    analysis = IncrementalAnalysis(cards_path, results_path)
+    rescored = analysis.build()
+    total = len(analysis.ids)
+    print(f"[WATCH] {total} cards ({rescored} rescored, {total - rescored} from cache), "
+          f"results -> {results_path}")
+    print(f"[WATCH] Watching {cards_path} (Ctrl+C to stop)")
+
+    def stamp():
+        st = cards_path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    last = stamp()
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                now = stamp()
+                if now == last:
+                    continue
+                started = time.perf_counter()
+                changes = analysis.refresh()
+            except (OSError, ValueError) as err:
+                # 编辑器保存到一半时文件可能暂时不完整，等下一次变化
+                print(f"[WATCH] cards.json unreadable ({err}); waiting for next save")
+                continue
+            last = now
+            ms = (time.perf_counter() - started) * 1000
+            if changes is None:
+                print(f"[WATCH] Card list changed; rebuilt {len(analysis.ids)} cards in {ms:.1f} ms")
+                continue
+            for result, old_net, old, new in changes:
+                print_detail(result)
+                print(f"  Rank: {old + 1} -> {new + 1}   Net: {old_net:+.2f} -> {result['net_value']:+.2f}")
+            print(f"[WATCH] {len(changes)} card(s) rescored in {ms:.1f} ms")
+    except KeyboardInterrupt:
+        print("\n[WATCH] Stopped")
+
+
+# ─── 性能剖析 (--profile) ─────────────────────────────────────────────────────
+# 剖析走独立的计时路径，正常运行时的解析/打分代码不含任何计时开销。
+# 每项耗时取 repeat 次测量的最小值 (纳秒)，以降低抖动，便于在提交之间对比。
+PROFILE_VERSION = 1
+
+
+def _best_ns(fn, repeat: int) -> int:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn()
+        dt = time.perf_counter_ns() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def profile_analysis(cards: list, repeat: int = 5) -> dict:
+    """
+    返回机器可读的剖析报告:
+      - totals_ns : 整体各阶段耗时 (冷缓存解析、扫描、打分、报告输出、JSON 序列化)
+      - rules     : 每条规则单独运行的总耗时、命中次数与命中卡数 (按 _RULES 顺序)
+      - cards     : 每张卡的解析/扫描耗时，以及各规则的 [耗时, 命中次数]
+    单条规则的耗时是把该预编译正则单独跑在效果文本上的开销，即新增一条规则时解析大致要多付的代价；
+    命中次数取自 _scan 的实际结果。
+    """
+    import io
+    import contextlib
+    import platform
+
+    parse_uncached = EffectParser._parse_cached.__wrapped__
+    compiled = _compiled_rules()
+    rules = {name: {'pattern': pattern, 'mode': mode, 'ns': 0, 'hits': 0, 'cards': 0}
+             for name, pattern, mode in _RULES}
+
+    per_card = []
+    for card in cards:
+        effect = card.get('effect', '')
+        e = effect.lower()
+        hits = _scan(e)
+        entry = {
+            'id': card['id'],
+            'parse_ns': _best_ns(lambda: parse_uncached(effect), repeat),
+            'scan_ns': _best_ns(lambda: _scan(e), repeat),
+            'rules': {},
+        }
+        for name, rx, mode in compiled:
+            run = (lambda: rx.search(e)) if mode == 'first' else (lambda: list(rx.finditer(e)))
+            ns = _best_ns(run, repeat)
+            n_hits = len(hits[name])
+            entry['rules'][name] = [ns, n_hits]
+            stat = rules[name]
+            stat['ns'] += ns
+            stat['hits'] += n_hits
+            stat['cards'] += 1 if n_hits else 0
+        per_card.append(entry)
+
+    def parse_all():
+        for c in cards:
+            parse_uncached(c.get('effect', ''))
+
+    def scan_all():
+        for c in cards:
+            _scan(c.get('effect', '').lower())
+
+    def score_cold():
+        EffectParser._parse_cached.cache_clear()
+        for c in cards:
+            scorer.score(c)
+
+    scorer = CardScorer()
+    results = sorted((scorer.score(c) for c in cards), key=lambda x: x['net_value'], reverse=True)
+
+    def report():
+        with contextlib.redirect_stdout(io.StringIO()):
+            print_report([dict(r) for r in results])
+
+    totals = {
+        'parse_uncached': _best_ns(parse_all, repeat),
+        'scan': _best_ns(scan_all, repeat),
+        'score_cold': _best_ns(score_cold, repeat),
+        'score_warm': _best_ns(lambda: [scorer.score(c) for c in cards], repeat),
+        'sort': _best_ns(lambda: sorted(results, key=lambda x: x['net_value'], reverse=True), repeat),
+        'report': _best_ns(report, repeat),
+        'json': _best_ns(lambda: export_results(results, io.StringIO()), repeat),
+    }
+    return {
+        'version': PROFILE_VERSION,
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'n_cards': len(cards),
+        'totals_ns': totals,
+        'rules': [dict(name=name, **stat) for name, stat in rules.items()],
+        'cards': per_card,
+    }
+
+
+def print_profile_summary(prof: dict, top_n: int = 10):
+    """在 stderr 上打印人读摘要 (JSON 报告本身写到 stdout 或文件)。"""
+    out = sys.stderr
+    print(f"[PROFILE] {prof['n_cards']} cards, best of {prof['repeat']}", file=out)
+    for key, ns in prof['totals_ns'].items():
+        print(f"  {key:<16} {ns / 1e6:9.3f} ms", file=out)
+    print(f"  Slowest rules (standalone, summed over all cards):", file=out)
+    for r in sorted(prof['rules'], key=lambda r: r['ns'], reverse=True)[:top_n]:
+        print(f"    {r['name']:<20} {r['ns'] / 1e3:9.1f} us  hits {r['hits']:>4}  cards {r['cards']:>3}", file=out)
+
+
+# ─── 主函数 ───────────────────────────────────────────────────────────────────
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Citadel card power analyzer')
+    ap.add_argument('--fit', action='store_true',
+                    help='fit WEIGHTS from simulated games instead of printing the ranking')
+    ap.add_argument('--games', type=int, default=FIT_GAMES, help='games to simulate for --fit')
+    ap.add_argument('--seed', type=int, default=None, help='master seed for --fit / --samples')
+    ap.add_argument('--workers', type=int, default=1, help='worker processes for --fit / --sweep')
+    ap.add_argument('--fit-out', type=Path, default=None, help='write the --fit result as JSON')
+    ap.add_argument('--binary', type=Path, default=None,
+                    help='also write a memory-mappable columnar copy of the results (see card_power_columns.py)')
+    ap.add_argument('--watch', action='store_true',
+                    help='watch cards.json and rescore only the cards that change')
+    ap.add_argument('--interval', type=float, default=0.5, help='polling interval for --watch (s)')
+    ap.add_argument('--profile', nargs='?', const='-', default=None, metavar='PATH',
+                    help='time every parse rule, scoring and output; write a JSON report to PATH (default stdout)')
+    ap.add_argument('--repeat', type=int, default=5, help='measurements per timing for --profile (best is kept)')
+    ap.add_argument('--sweep', action='append', default=None, metavar='NAME=LO:HI[:STEPS]',
+                    help='weight range to sweep (repeatable); grid unless --samples is given')
+    ap.add_argument('--samples', type=int, default=None, help='Latin-hypercube sample size for --sweep')
+    ap.add_argument('--sweep-out', type=Path, default=None, help='write the --sweep report as JSON')
+    ap.add_argument('--card', action='append', default=None, metavar='ID_OR_NAME',
+                    help='score and show only this card (repeatable); skips the JSON unless --json')
+    ap.add_argument('--color', action='append', default=None, type=str.title, choices=COLORS,
+                    help='restrict the report to this color (repeatable)')
+    ap.add_argument('--section', action='append', default=None, choices=list(REPORT_SECTIONS),
+                    help='print only this report section (repeatable)')
+    ap.add_argument('--json', action='store_true',
+                    help='write the results JSON even for --card / --color / --section runs')
+    ap.add_argument('--no-json', action='store_true', help='do not write the results JSON')
+    ap.add_argument('--cards', type=Path, default=None, help='cards.json to analyze (default src/cards.json)')
+    ap.add_argument('--ir', type=Path, default=None,
+                    help='analyze a compiled card IR (tools/card_ir.py) instead of parsing cards.json')
+    ap.add_argument('--output', type=Path, default=None,
+                    help='results JSON path (default tools/card_power_results.json)')
+    args = ap.parse_args(argv)
+
+    # 找到 cards.json 路径 (工具脚本在 tools/ 下，cards.json 在 src/ 下)
+    script_dir = Path(__file__).parent
+    cards_path = args.cards or script_dir.parent / 'src' / 'cards.json'
+    output_path = args.output or script_dir / 'card_power_results.json'
+
+    if args.ir and args.watch:
+        ap.error('--watch re-parses cards.json as it changes and cannot be combined with --ir')
+    if not cards_path.exists():
+        print(f"[ERROR] cards.json not found: {cards_path}")
+        return
+
+    if args.watch:
+        watch(cards_path, output_path, args.interval)
+        return
+
+    if args.ir:
+        # IR 自带解析结果: 打分直接读取 signals，不再解析效果文本；IR 落后于 cards.json 时拒绝运行
+        from card_ir import load_ir
+        try:
+            cards = load_ir(args.ir, cards_path)['cards']
+        except (OSError, ValueError) as err:
+            ap.error(str(err))
+    else:
+        with open(cards_path, encoding='utf-8') as f:
+            cards = json.load(f)
+
+    if args.profile:
+        prof = profile_analysis(cards, args.repeat)
+        print_profile_summary(prof)
+        text = json.dumps(prof, ensure_ascii=False, indent=2)
+        if args.profile == '-':
+            print(text)
+        else:
+            Path(args.profile).write_text(text + '\n', encoding='utf-8')
+            print(f"[DONE] Profile written to: {args.profile}", file=sys.stderr)
+        return
+
+    if not (args.card or args.color or args.section):
+        print(f"[OK] Loaded {len(cards)} cards from {(args.ir or cards_path).name}")
+
+    if args.sweep:
+        try:
+            specs = [parse_sweep_spec(spec) for spec in args.sweep]
+            W = sweep_configs(specs, args.samples, seed=args.seed or 0)
+        except ValueError as e:
+            ap.error(str(e))
+        started = time.perf_counter()
+
+        def sweep_progress(done, total):
+            print(f"\r  {done}/{total} configurations", end='', file=sys.stderr, flush=True)
+
+        report = run_sweep(cards, W, workers=args.workers, on_progress=sweep_progress)
+        print(file=sys.stderr)
+        print_sweep(report, len(W))
+        print(f"\n[DONE] {len(W)} configurations in {time.perf_counter() - started:.1f}s")
+        if args.sweep_out:
+            with open(args.sweep_out, 'w', encoding='utf-8') as f:
+                json.dump({'specs': args.sweep, 'configs': len(W), 'cards': report}, f,
+                          ensure_ascii=False, indent=2)
+            print(f"[DONE] Sweep report exported to: {args.sweep_out}")
+        return
+
+    if args.fit:
+        def progress(tally):
+            print(f"\r  {tally['games']}/{args.games} games", end='', file=sys.stderr, flush=True)
+
+        fit = fit_weights(cards, args.games, seed=args.seed, workers=args.workers, on_progress=progress)
+        print(file=sys.stderr)
+        print_fit(fit)
+        if args.fit_out:
+            with open(args.fit_out, 'w', encoding='utf-8') as f:
+                json.dump(fit, f, ensure_ascii=False, indent=2)
+            print(f"\n[DONE] Fit exported to: {args.fit_out}")
+        return
+
+    if args.card:
+        # 单卡查询: 只解析打分被点名的卡
+        wanted = {name.lower() for name in args.card}
+        picked = [c for c in cards if c['id'].lower() in wanted or c['name'].lower() in wanted]
+        if not picked:
+            print(f"[ERROR] No card matches: {', '.join(args.card)}")
+            sys.exit(1)
+        scorer = CardScorer()
+        for card in picked:
+            print_detail(scorer.score(card))
+        if args.json or args.binary:
+            ranked = rank_cards(cards)
+            if args.json:
+                export_full(ranked, output_path)
+            if args.binary:
+                export_binary(ranked, args.binary)
+        return
+
+    selective = bool(args.color or args.section)
+    shown = [c for c in cards if c.get('color') in args.color] if args.color else cards
+    scorer = CardScorer()
+    results = [scorer.score(c) for c in shown]
+
+    # 按净价值从高到低排序
+    results.sort(key=lambda x: x['net_value'], reverse=True)
+
+    if not selective:
+        print_report(results)
+    elif args.section:
+        print_report(results, [k for k in REPORT_SECTIONS if k in args.section],
+                     [c for c in COLORS if c in args.color] if args.color else None)
+    else:
+        # 只给了 --color: 打印这些颜色的完整榜单
+        print_color_tables(results, [c for c in COLORS if c in args.color], top_n=None)
+
+    # ── 导出 (完整报告默认导出 JSON；分节/分色查询需 --json)，--color 只筛选打印，导出总是整副卡组 ──
+    ranked = results if shown is cards else None
+    if args.json or not (selective or args.no_json):
+        ranked = ranked if ranked is not None else rank_cards(cards)
+        export_full(ranked, output_path)
+    if args.binary:
+        export_binary(ranked if ranked is not None else rank_cards(cards), args.binary)
+
+    # ── 权重调整提示 ──
+    if not selective:
+        print_calibration()
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,270 @@
+"""
+Citadel Benchmark Harness
+===========================
+测量解析、打分、完整分析与对局模拟的吞吐量，并与历史记录比较:
+
+  - parse/s   : EffectParser.parse (冷缓存) 每秒解析的卡牌数
+  - score/s   : CardScorer.score (冷缓存) 每秒打分的卡牌数
+  - main      : card_power_analyzer.main() 的完整耗时 (输出重定向，结果写入临时目录)
+  - games/s   : card_simulator 每秒模拟的对局数 (装有 numpy 时另测批量版)
+
+除真实卡组外，还以 cards.json 为模板生成 1k / 10k / 100k 张的合成卡组
+(效果文本中的数字随机替换)。每遍计时前清空解析缓存；卡组越大，重复文本越多，
+缓存命中也越多，这与真实卡组的情况一致，因此大卡组的 parse/s 会偏高。
+
+小卡组单遍只要几毫秒，计时噪声足以越过回退阈值，因此每次计时重复整遍卡组，
+直到处理的卡牌数不少于 --sample (默认 5000)。合成卡组与模拟对局的随机种子由 --seed 固定；
+种子与样本量记入历史，只与相同配置的历史记录比较。
+
+每次运行都追加一条记录到历史文件，回退的运行带 regressed 标记。
+基线为同一台机器、相同配置最近几次运行 (含回退的运行) 的中位数，因此一次偶然偏快的运行
+不会永久固定基线，有意的变慢 (如新增解析规则) 在几次运行后也会进入基线。
+任一指标变差超过阈值时以退出码 1 结束，可直接用作 CI 门禁。
+确认变慢是预期的之后，用 --rebaseline 让本次运行成为新基线的起点 (之前的记录不再参与比较)。
+
+用法:
+  python tools/card_power_bench.py
+  python tools/card_power_bench.py --sizes 1000,10000 --threshold 0.15
+  python tools/card_power_bench.py --rebaseline      # 接受当前性能为新基线
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import card_power_analyzer as analyzer
+import card_simulator as simulator
+
+HISTORY_PATH = Path(__file__).parent / 'card_power_bench_history.json'
+DEFAULT_SIZES = [1000, 10000, 100000]
+THRESHOLD = 0.20      # 相对基线变差 20% 视为回退
+BASELINE_RUNS = 5     # 基线取同机最近几次运行的中位数
+REPEAT = 5            # 每项计时的运行次数 (取最快一次)
+SAMPLE_CARDS = 5000   # 每次计时至少处理的卡牌数 (小卡组重复多遍)
+SEED = 0
+
+
+def synthetic_deck(cards: list, size: int, seed: int = 0) -> list:
+    """以真实卡牌为模板生成 size 张卡: id 唯一，效果文本中的数字与费用随机替换。"""
+    rng = random.Random(f'{seed}:{size}')
+    deck = []
+    for i in range(size):
+        card = dict(cards[i % len(cards)])
+        card['id'] = f'syn_{i:06d}'
+        card['effect'] = re.sub(r'\d+', lambda m: str(rng.randint(1, 12)), card.get('effect', ''))
+        card['cost'] = max(0, card.get('cost', 0) + rng.randint(-2, 2))
+        deck.append(card)
+    return deck
+
+
+def best_time(fn, repeat: int) -> float:
+    """fn 运行 repeat 次的最短耗时 (秒)。"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def passes_for(deck: list, sample: int) -> int:
+    """一次计时要跑的遍数，使处理的卡牌数不少于 sample。"""
+    return max(1, -(-sample // len(deck)))
+
+
+def bench_parse(deck: list, repeat: int, passes: int = 1) -> float:
+    parser = analyzer.EffectParser()
+    effects = [c.get('effect', '') for c in deck]
+
+    def run():
+        for _ in range(passes):
+            analyzer.EffectParser._parse_cached.cache_clear()
+            for e in effects:
+                parser.parse(e)
+    return len(deck) * passes / best_time(run, repeat)
+
+
+def bench_score(deck: list, repeat: int, passes: int = 1) -> float:
+    scorer = analyzer.CardScorer()
+
+    def run():
+        for _ in range(passes):
+            analyzer.EffectParser._parse_cached.cache_clear()
+            for c in deck:
+                scorer.score(c)
+    return len(deck) * passes / best_time(run, repeat)
+
+
+def bench_main(deck: list, repeat: int, passes: int = 1) -> float:
+    """main() 单遍的耗时 (秒)，取 passes 遍的平均。"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cards_path = Path(tmp) / 'cards.json'
+        with open(cards_path, 'w', encoding='utf-8') as f:
+            json.dump(deck, f, ensure_ascii=False)
+        argv = ['--cards', str(cards_path), '--output', str(Path(tmp) / 'results.json')]
+
+        def run():
+            for _ in range(passes):
+                analyzer.EffectParser._parse_cached.cache_clear()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    analyzer.main(argv)
+        return best_time(run, repeat) / passes
+
+
+def bench_simulation(cards: list, games: int, repeat: int, seed: int = SEED) -> float:
+    return games / best_time(lambda: simulator.run_many(cards, games, seed=seed), repeat)
+
+
+def bench_batch_simulation(cards: list, games: int, repeat: int, seed: int = SEED):
+    try:
+        import card_batch_simulator
+    except ImportError:
+        return None
+    return games / best_time(lambda: card_batch_simulator.run_batched(cards, games, seed=seed), repeat)
+
+
+# 指标名 -> 是否越大越好
+def _higher_is_better(metric: str) -> bool:
+    return not metric.startswith('main_s')
+
+
+def run_benchmarks(sizes: list, repeat: int, games: int, batch_games: int,
+                   seed: int = SEED, sample: int = SAMPLE_CARDS, log=print) -> dict:
+    cards = simulator.load_cards()
+    decks = [('real', cards)] + [(f'{n // 1000}k' if n % 1000 == 0 else str(n), synthetic_deck(cards, n, seed))
+                                 for n in sizes]
+    metrics = {}
+    for label, deck in decks:
+        passes = passes_for(deck, sample)
+        metrics[f'parse_per_s/{label}'] = bench_parse(deck, repeat, passes)
+        metrics[f'score_per_s/{label}'] = bench_score(deck, repeat, passes)
+        metrics[f'main_s/{label}'] = bench_main(deck, repeat, passes)
+        log(f"  {label:>5} cards: parse {metrics[f'parse_per_s/{label}']:>10,.0f}/s  "
+            f"score {metrics[f'score_per_s/{label}']:>10,.0f}/s  "
+            f"main {metrics[f'main_s/{label}']:8.3f}s")
+    metrics['games_per_s/scalar'] = bench_simulation(cards, games, repeat, seed)
+    log(f"  simulator: {metrics['games_per_s/scalar']:,.0f} games/s")
+    batched = bench_batch_simulation(cards, batch_games, repeat, seed)
+    if batched is not None:
+        metrics['games_per_s/batch'] = batched
+        log(f"  batch simulator: {batched:,.0f} games/s")
+    return metrics
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=Path(__file__).parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_history(path: Path) -> list:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def baseline_runs(history: list, host: str, config: dict = None) -> list:
+    """
+    同机、同配置 (种子、样本量、对局数) 最近 BASELINE_RUNS 次运行，包括回退的运行；
+    只取最近一次 --rebaseline 运行及其之后的记录。config 为 None 时不按配置筛选。
+    """
+    runs = [h for h in history if h.get('host') == host and (config is None or h.get('config') == config)]
+    starts = [i for i, h in enumerate(runs) if h.get('rebaseline')]
+    if starts:
+        runs = runs[starts[-1]:]
+    return runs[-BASELINE_RUNS:]
+
+
+def find_regressions(metrics: dict, history: list, host: str, threshold: float, config: dict = None) -> list:
+    """返回 [(指标, 本次值, 基线值, 变差比例), ...]；基线为 baseline_runs 各次的中位数。"""
+    same_host = baseline_runs(history, host, config)
+    regressions = []
+    for metric, value in metrics.items():
+        past = [h['metrics'][metric] for h in same_host if metric in h['metrics']]
+        if not past:
+            continue
+        base = statistics.median(past)
+        worse = (base - value) / base if _higher_is_better(metric) else (value - base) / base
+        if worse > threshold:
+            regressions.append((metric, value, base, worse))
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark the card analyzer and simulator')
+    ap.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                    help='synthetic deck sizes, comma-separated (empty for the real deck only)')
+    ap.add_argument('--repeat', type=int, default=REPEAT, help='runs per measurement (best is kept)')
+    ap.add_argument('--games', type=int, default=2000, help='games for the scalar simulator')
+    ap.add_argument('--batch-games', type=int, default=20000, help='games for the batch simulator')
+    ap.add_argument('--threshold', type=float, default=THRESHOLD,
+                    help='fail when a metric is this much worse than the baseline (0.2 = 20%%)')
+    ap.add_argument('--seed', type=int, default=SEED, help='seed for the synthetic decks and simulated games')
+    ap.add_argument('--sample', type=int, default=SAMPLE_CARDS,
+                    help='minimum cards processed per timing; small decks are repeated to reach it')
+    ap.add_argument('--history', type=Path, default=HISTORY_PATH, help='history file')
+    ap.add_argument('--no-save', action='store_true', help='do not append this run to the history')
+    ap.add_argument('--rebaseline', action='store_true',
+                    help='accept this run as the start of a new baseline instead of comparing against the old one')
+    args = ap.parse_args(argv)
+    if args.sample <= 0:
+        ap.error('--sample must be positive')
+    if args.repeat <= 0:
+        ap.error('--repeat must be positive')
+    if args.rebaseline and args.no_save:
+        ap.error('--rebaseline records the run, so it cannot be combined with --no-save')
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    host = platform.node()
+    config = {'seed': args.seed, 'sample': args.sample, 'games': args.games, 'batch_games': args.batch_games}
+    print(f"Benchmarking on {host} (Python {platform.python_version()}, best of {args.repeat}, "
+          f"seed {args.seed}, sample {args.sample} cards)")
+    metrics = run_benchmarks(sizes, args.repeat, args.games, args.batch_games, args.seed, args.sample)
+
+    history = load_history(args.history)
+    regressions = [] if args.rebaseline else find_regressions(metrics, history, host, args.threshold, config)
+
+    if not args.no_save:
+        history.append({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'host': host,
+            'python': platform.python_version(),
+            'repeat': args.repeat,
+            'config': config,
+            'regressed': bool(regressions),
+            'rebaseline': args.rebaseline,
+            'metrics': metrics,
+        })
+        with open(args.history, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2)
+        print(f"[DONE] Appended to {args.history}" + (" as a new baseline" if args.rebaseline else ""))
+
+    if regressions:
+        print(f"\n[FAIL] {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}:")
+        for metric, value, base, worse in regressions:
+            print(f"  {metric:<24} {value:>14,.3f}  baseline {base:>14,.3f}  ({worse:+.1%} worse)")
+        sys.exit(1)
+    if args.rebaseline:
+        print("\n[OK] Baseline reset; later runs compare against this one")
+    else:
+        print("\n[OK] No regressions against the stored baseline")
+
+
+if __name__ == '__main__':
+    main()
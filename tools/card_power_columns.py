@@ -0,0 +1,202 @@
+"""
+Citadel Card Power Columnar Export
+====================================
+card_power_results.json 的列式二进制版本，可直接内存映射、按列切片，无需解析 JSON。
+
+文件布局 (小端序，各段按 8 字节对齐):
+  0   magic      4 字节 b'CPWR'
+  4   version    uint32
+  8   schema_len uint32
+  12  schema     UTF-8 JSON，描述行数、各列与字符串表的位置
+  ..  columns    每列 rows 个定宽数值，按排行顺序 (与 JSON 的 rank 顺序一致)
+  ..  strings    uint32 偏移表 (count + 1 项) + UTF-8 字节块
+
+schema 示例:
+  {"rows": 102,
+   "columns": [{"name": "net_value", "dtype": "<f8", "offset": 1024}, ...],
+   "strings": {"count": 380, "offsets": 9000, "data": 10528}}
+
+字符串列 (id / name / name_zh / color / effect) 存的是字符串表下标 (uint32)；
+breakdown 的每个键展开为一列 "breakdown.<键>"，该卡没有此项时为 0。
+
+用法:
+  python tools/card_power_analyzer.py --binary tools/card_power_results.bin
+  python tools/card_power_columns.py tools/card_power_results.bin
+"""
+
+import array
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+MAGIC = b'CPWR'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sII')
+
+STRING_COLUMNS = ['id', 'name', 'name_zh', 'color', 'effect']
+NUMERIC_COLUMNS = [('rank', '<i4'), ('cost', '<i4'), ('net_value', '<f8'),
+                   ('input_pts', '<f8'), ('output_pts', '<f8')]
+# dtype -> array / memoryview 类型码
+_TYPECODE = {'<i4': 'i', '<u4': 'I', '<f8': 'd'}
+
+
+def _align(n: int, to: int = 8) -> int:
+    return (n + to - 1) // to * to
+
+
+def _pack(values, dtype: str) -> bytes:
+    data = array.array(_TYPECODE[dtype], values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def write_columns(path: Path, results: list, breakdown_keys: list = None):
+    """
+    把按排行排好序的打分结果 (CardScorer.score 的返回值列表) 写成列式文件。
+    breakdown_keys 为 None 时取结果中出现过的全部 breakdown 键 (按首次出现顺序)。
+    """
+    if breakdown_keys is None:
+        breakdown_keys = list(dict.fromkeys(k for r in results for k in r['breakdown']))
+
+    strings, index = [], {}
+
+    def intern(s: str) -> int:
+        if s not in index:
+            index[s] = len(strings)
+            strings.append(s)
+        return index[s]
+
+    columns = [(name, '<u4', [intern(r[name]) for r in results]) for name in STRING_COLUMNS]
+    columns += [(name, dtype, [i + 1 for i in range(len(results))] if name == 'rank'
+                 else [r[name] for r in results]) for name, dtype in NUMERIC_COLUMNS]
+    columns += [(f'breakdown.{k}', '<f8', [r['breakdown'].get(k, 0.0) for r in results])
+                for k in breakdown_keys]
+    blobs = [_pack(values, dtype) for _, dtype, values in columns]
+
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+
+    # schema 里的偏移量依赖 schema 自身的长度，迭代到长度不再变化
+    schema_len = 0
+    while True:
+        pos = _align(_PREAMBLE.size + schema_len)
+        layout = []
+        for (name, dtype, _), blob in zip(columns, blobs):
+            layout.append({'name': name, 'dtype': dtype, 'offset': pos})
+            pos = _align(pos + len(blob))
+        str_offsets = pos
+        str_data = str_offsets + 4 * len(offsets)
+        schema = json.dumps({
+            'rows': len(results),
+            'columns': layout,
+            'strings': {'count': len(strings), 'offsets': str_offsets, 'data': str_data},
+        }, ensure_ascii=False).encode('utf-8')
+        if len(schema) == schema_len:
+            break
+        schema_len = len(schema)
+
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(schema)) + schema)
+        for col, blob in zip(layout, blobs):
+            f.write(b'\0' * (col['offset'] - f.tell()))
+            f.write(blob)
+        f.write(b'\0' * (str_offsets - f.tell()))
+        f.write(_pack(offsets, '<u4'))
+        f.write(b''.join(encoded))
+
+
+class ColumnarResults:
+    """
+    内存映射读取列式文件。column() 返回零拷贝的 memoryview，
+    array() 在安装了 numpy 时返回零拷贝的 ndarray。
+
+    close() (或 with 语句结束时) 释放 column() 返回的全部 memoryview，之后再访问它们会抛 ValueError；
+    array() 返回的 ndarray 无法被强制释放，它们仍被引用时映射保持打开，
+    直到最后一个数组被回收才解除映射，而不是在 close() 中抛 BufferError。
+    """
+
+    def __init__(self, path: Path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        magic, version, schema_len = _PREAMBLE.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a card power columnar file")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported version {version} (expected {VERSION})")
+        schema = json.loads(bytes(self._map[_PREAMBLE.size:_PREAMBLE.size + schema_len]))
+        self.rows = schema['rows']
+        self.columns = {c['name']: c for c in schema['columns']}
+        self._strings = schema['strings']
+        self._string_offsets = self._view(self._strings['offsets'], '<u4', self._strings['count'] + 1)
+
+    def _view(self, offset: int, dtype: str, count: int) -> memoryview:
+        if sys.byteorder != 'little':
+            raise RuntimeError("zero-copy column views require a little-endian host; use array()")
+        size = struct.calcsize(_TYPECODE[dtype]) * count
+        view = memoryview(self._map)[offset:offset + size].cast(_TYPECODE[dtype])
+        self._views.append(view)
+        return view
+
+    def column(self, name: str) -> memoryview:
+        col = self.columns[name]
+        return self._view(col['offset'], col['dtype'], self.rows)
+
+    def array(self, name: str):
+        import numpy as np
+        col = self.columns[name]
+        return np.frombuffer(self._map, dtype=col['dtype'], count=self.rows, offset=col['offset'])
+
+    def string(self, i: int) -> str:
+        start, end = self._string_offsets[i], self._string_offsets[i + 1]
+        base = self._strings['data']
+        return self._map[base + start:base + end].decode('utf-8')
+
+    def strings(self, name: str) -> list:
+        return [self.string(i) for i in self.column(name)]
+
+    def close(self):
+        if self._map is None:
+            return
+        for view in self._views:
+            try:
+                view.release()
+            except BufferError:      # 该 memoryview 又被导出 (如 np.asarray(view))，随导出者一起回收
+                pass
+        self._views.clear()
+        try:
+            self._map.close()
+        except BufferError:
+            # array() 返回的 ndarray 仍引用映射: 交给垃圾回收，最后一个数组释放时自动解除映射
+            pass
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python tools/card_power_columns.py <file.bin>")
+        sys.exit(2)
+    with ColumnarResults(Path(argv[0])) as data:
+        print(f"{data.rows} rows, {len(data.columns)} columns")
+        for name, col in data.columns.items():
+            print(f"  {name:<40} {col['dtype']}")
+        names, net = data.strings('name'), data.column('net_value')
+        print("\nTop 5 by net value:")
+        for i in range(min(5, data.rows)):
+            print(f"  {i + 1:>3}. {names[i]:<24} {net[i]:+.2f}")
+
+
+if __name__ == '__main__':
+    main()
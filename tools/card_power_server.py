@@ -0,0 +1,354 @@
+"""
+Citadel Card Power Server
+===========================
+常驻进程的本地 HTTP/JSON 接口。卡组、解析结果、打分与信号矩阵都常驻内存，
+请求只做查表或一次矩阵运算，无需每次启动 Python 进程。
+基于 asyncio，单个事件循环并发处理多个连接 (支持 keep-alive)。
+
+接口:
+  GET  /health                       -> {"ok": true, "cards": 102}
+  GET  /cards/<id>                   -> 单卡打分详情 (与 CardScorer.score 相同)
+  GET  /rankings[?color=Red&top=10]  -> 当前 WEIGHTS 下的排行 (可按颜色过滤)
+  POST /score                        -> 为任意效果文本打分
+       {"effect": "+3 Wall. Play again", "cost": 2, "color": "Red", "weights": {...}}
+  POST /rescore                      -> 用自定义权重重新排行 (未给出的权重取 WEIGHTS)
+       {"weights": {"play_again": 3.0}, "color": "Blue", "top": 20}
+  POST /reload                       -> 重新读取 cards.json
+
+cards.json 的修改时间变化时，下一个请求前会自动重新加载。
+
+给出 --ir 时从预编译的 IR (tools/card_ir.py) 加载，打分直接读取 signals，不解析效果文本。
+IR 落后于 cards.json (启动时或 cards.json 在运行中被修改) 时，在内存中重新编译并给出提示，
+不改写 IR 文件。
+
+用法:
+  python tools/card_power_server.py --port 8765
+  python tools/card_power_server.py --ir tools/card_ir.json
+  curl -s localhost:8765/rankings?color=Red\\&top=5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from card_power_analyzer import WEIGHTS, CardScorer, EffectParser, COLORS, export_entry
+
+DEFAULT_PORT = 8765
+MAX_HEADER = 16 * 1024
+MAX_BODY = 1024 * 1024
+RESCORE_CACHE_SIZE = 256
+
+_REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    """close=True 表示无法确定请求正文的边界，回复后必须关闭连接。"""
+    def __init__(self, status: int, message: str, close: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.close = close
+
+
+class CardPowerService:
+    """接口背后的内存状态: 卡组、默认权重下的打分与排行、信号矩阵 (需要 numpy)。"""
+
+    def __init__(self, cards_path: Path, ir_path: Path = None):
+        self.cards_path = cards_path
+        self.ir_path = ir_path
+        self.parser = EffectParser()
+        self._mtime = None
+        self.load()
+
+    def load(self):
+        self._mtime = self.cards_path.stat().st_mtime_ns
+        if self.ir_path is None:
+            with open(self.cards_path, encoding='utf-8') as f:
+                self.cards = json.load(f)
+        else:
+            from card_ir import compile_file, load_ir
+            try:
+                self.cards = load_ir(self.ir_path, self.cards_path)['cards']
+            except ValueError as err:
+                print(f"[SERVE] {err}; recompiled in memory", file=sys.stderr)
+                self.cards = compile_file(self.cards_path)['cards']
+        scorer = CardScorer()
+        self.results = sorted((scorer.score(c) for c in self.cards),
+                              key=lambda x: x['net_value'], reverse=True)
+        self.by_id = {r['id']: r for r in self.results}
+        self._matrix = None
+        self._rescore_cache = {}
+
+    def reload_if_changed(self):
+        try:
+            mtime = self.cards_path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+
+    @property
+    def matrix(self):
+        """SignalMatrix 在第一次自定义权重请求时才构建；没有 numpy 时为 None。"""
+        if self._matrix is None:
+            try:
+                from card_power_analyzer import SignalMatrix
+                self._matrix = SignalMatrix(self.cards, self.parser)
+            except ImportError:
+                self._matrix = False
+        return self._matrix or None
+
+    # ── 接口实现 ──────────────────────────────────────────────────────────────
+    def health(self, query, body):
+        return {'ok': True, 'cards': len(self.cards)}
+
+    def card(self, card_id: str):
+        result = self.by_id.get(card_id)
+        if result is None:
+            raise HTTPError(404, f"unknown card id '{card_id}'")
+        return result
+
+    def rankings(self, query, body):
+        color = _color(query.get('color'))
+        top = _top(query.get('top'))
+        rows = [r for r in self.results if color is None or r['color'] == color]
+        return [export_entry(i + 1, r) for i, r in enumerate(rows[:top])]
+
+    def score(self, query, body):
+        if not isinstance(body.get('effect'), str):
+            raise HTTPError(400, "'effect' (string) is required")
+        cost = body.get('cost', 0)
+        if isinstance(cost, bool) or not isinstance(cost, (int, float)) or not math.isfinite(cost):
+            raise HTTPError(400, "'cost' must be a finite number")
+        card = {
+            'id': body.get('id', 'adhoc'),
+            'name': body.get('name', 'Ad-hoc card'),
+            'name_zh': body.get('name_zh', ''),
+            'color': body.get('color', ''),
+            'cost': cost,
+            'effect': body['effect'],
+        }
+        weights = _weights(body.get('weights'))
+        return CardScorer(weights).score(card)
+
+    def rescore(self, query, body):
+        weights = _weights(body.get('weights'))
+        color = _color(body.get('color'))
+        top = _top(body.get('top'))
+        key = tuple(weights.values())
+        ranked = self._rescore_cache.get(key)
+        if ranked is None:
+            ranked = self._rank(weights)
+            if len(self._rescore_cache) >= RESCORE_CACHE_SIZE:
+                self._rescore_cache.pop(next(iter(self._rescore_cache)))
+            self._rescore_cache[key] = ranked
+        rows = [r for r in ranked if color is None or r['color'] == color]
+        return {'weights': weights,
+                'rankings': [dict(r, rank=i + 1) for i, r in enumerate(rows[:top])]}
+
+    def reload(self, query, body):
+        self.load()
+        return {'ok': True, 'cards': len(self.cards)}
+
+    def _rank(self, weights: dict) -> list:
+        """自定义权重下的完整排行；有 numpy 时一次矩阵乘法，否则逐卡打分。"""
+        matrix = self.matrix
+        if matrix is not None:
+            net = [float(x) for x in matrix.net_values(weights)]
+        else:
+            scorer = CardScorer(weights)
+            net = [scorer.score(c)['net_value'] for c in self.cards]
+        order = sorted(range(len(self.cards)), key=lambda j: -net[j])
+        return [{'id': self.cards[j]['id'], 'name': self.cards[j]['name'],
+                 'color': self.cards[j]['color'], 'cost': self.cards[j].get('cost', 0),
+                 'net_value': net[j]} for j in order]
+
+    def dispatch(self, method: str, path: str, query: dict, body: dict):
+        self.reload_if_changed()
+        if path.startswith('/cards/'):
+            if method != 'GET':
+                raise HTTPError(405, f"{method} not allowed on {path}")
+            return self.card(path[len('/cards/'):])
+        route = ROUTES.get(path)
+        if route is None:
+            raise HTTPError(404, f"no such endpoint: {path}")
+        allowed, handler = route
+        if method != allowed:
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        return handler(self, query, body)
+
+
+# 路径 -> (方法, 处理函数)
+ROUTES = {
+    '/health':   ('GET', CardPowerService.health),
+    '/rankings': ('GET', CardPowerService.rankings),
+    '/score':    ('POST', CardPowerService.score),
+    '/rescore':  ('POST', CardPowerService.rescore),
+    '/reload':   ('POST', CardPowerService.reload),
+}
+
+
+def _color(value):
+    if value is None:
+        return None
+    color = str(value).title()
+    if color not in COLORS:
+        raise HTTPError(400, f"unknown color '{value}' (choose from: {', '.join(COLORS)})")
+    return color
+
+
+def _top(value):
+    if value is None:
+        return None
+    try:
+        top = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "'top' must be an integer") from None
+    if top < 0:
+        raise HTTPError(400, "'top' must be non-negative")
+    return top
+
+
+def _weights(overrides) -> dict:
+    """把部分权重覆盖合并进 WEIGHTS，并校验键名与数值类型。"""
+    if overrides is None:
+        return dict(WEIGHTS)
+    if not isinstance(overrides, dict):
+        raise HTTPError(400, "'weights' must be an object")
+    unknown = [k for k in overrides if k not in WEIGHTS]
+    if unknown:
+        raise HTTPError(400, f"unknown weight(s): {', '.join(unknown)}")
+    # 1e400 之类的值在 json.loads 中溢出为 inf，与 NaN / Infinity 字面量一样拒绝
+    bad = [k for k, v in overrides.items()
+           if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v)]
+    if bad:
+        raise HTTPError(400, f"weight(s) must be finite numbers: {', '.join(bad)}")
+    return {k: float(overrides.get(k, v)) for k, v in WEIGHTS.items()}
+
+
+# ─── HTTP 层 ──────────────────────────────────────────────────────────────────
+def _response(status: int, payload, keep_alive: bool) -> bytes:
+    """payload 中含 inf / NaN 时抛 ValueError: 它们不是合法 JSON，前端的 JSON.parse 无法解析。"""
+    body = b'' if payload is None else json.dumps(payload, ensure_ascii=False, allow_nan=False).encode('utf-8')
+    headers = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        # React 开发服务器在另一个端口，放开跨域
+        "Access-Control-Allow-Origin: *",
+        "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+        "Access-Control-Allow-Headers: Content-Type",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """读取一个请求，返回 (方法, 目标, 头部字典, 正文字节)；连接关闭时返回 None。"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "request header too large") from None
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "Content-Length must be an integer", close=True) from None
+    if length < 0:
+        raise HTTPError(400, "Content-Length must be non-negative", close=True)
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+
+def make_handler(service: CardPowerService):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep_alive = True
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, raw = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    if method == 'OPTIONS':
+                        writer.write(_response(204, None, keep_alive))
+                    else:
+                        url = urlsplit(target)
+                        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                        try:
+                            body = json.loads(raw) if raw else {}
+                        except ValueError:
+                            raise HTTPError(400, "body is not valid JSON") from None
+                        if not isinstance(body, dict):
+                            raise HTTPError(400, "body must be a JSON object")
+                        payload = service.dispatch(method, url.path.rstrip('/') or '/', query, body)
+                        try:
+                            response = _response(200, payload, keep_alive)
+                        except ValueError:      # 有限的输入在打分中溢出
+                            raise HTTPError(400, "result is not a finite number; use smaller values") from None
+                        writer.write(response)
+                except HTTPError as err:
+                    keep_alive = keep_alive and err.status != 413 and not err.close
+                    writer.write(_response(err.status, {'error': str(err)}, keep_alive))
+                except Exception as err:      # 单个请求出错不影响服务器
+                    writer.write(_response(500, {'error': f"{type(err).__name__}: {err}"}, False))
+                    keep_alive = False
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(service: CardPowerService, host: str, port: int):
+    server = await asyncio.start_server(make_handler(service), host, port, limit=MAX_HEADER)
+    addrs = ', '.join(f"http://{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"[SERVE] {len(service.cards)} cards loaded, listening on {addrs} (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Local HTTP/JSON server for card power queries')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=DEFAULT_PORT)
+    ap.add_argument('--cards', type=Path, default=Path(__file__).parent.parent / 'src' / 'cards.json')
+    ap.add_argument('--ir', type=Path, default=None,
+                    help='serve a compiled card IR (tools/card_ir.py) built from --cards instead of parsing it')
+    args = ap.parse_args(argv)
+
+    if not args.cards.exists():
+        print(f"[ERROR] cards.json not found: {args.cards}")
+        sys.exit(1)
+    if args.ir and not args.ir.exists():
+        ap.error(f"IR not found: {args.ir}")
+    service = CardPowerService(args.cards, args.ir)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n[SERVE] Stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,684 @@
+"""
+Citadel Game Simulator
+=======================
+simulate.js 的 Python 移植版: 与 JS 版使用相同的状态字段 (INITIAL_STATE)、
+相同的组牌规则 (每张卡两份) 和相同的回合循环。
+
+与 JS 版每次出牌都用正则重新解析效果文本不同，这里在开局前把每张卡的效果
+编译一次为操作序列 (op)，再把 op 绑定成小闭包，对局中只执行闭包。
+
+用法:
+  python tools/card_simulator.py 1000            # 等价于 node simulate.js 1000
+  python tools/card_simulator.py 1000 --seed 42  # 固定随机种子，结果可复现
+  python tools/card_simulator.py 100000 --seed 42 --workers 32  # 多进程分片，结果与进程数无关
+  python tools/card_simulator.py 10000 --seed 42 --log games.jsonl.gz  # 逐局 JSONL 日志 (见 card_log_ingest.py)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import multiprocessing
+import random
+import re
+import sys
+from pathlib import Path
+
+# 强制 stdout 使用 UTF-8 (兼容 Windows GBK 终端)
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# ─── 对局常量 (与 simulate.js 一致) ──────────────────────────────────────────────
+INITIAL_STATE = {'tower': 30, 'wall': 10, 'quarries': 2, 'bricks': 5,
+                 'magic': 2, 'gems': 5, 'dungeon': 2, 'beasts': 5}
+
+# 状态在对局中以 list 存储，下标顺序与 INITIAL_STATE 一致
+STATS = list(INITIAL_STATE)
+TOWER, WALL, QUARRIES, BRICKS, MAGIC, GEMS, DUNGEON, BEASTS = range(len(STATS))
+_STAT = {name: i for i, name in enumerate(STATS)}
+
+# 卡牌颜色 -> 支付费用的资源 (canAfford)
+COLOR_RESOURCE = {'Red': 'bricks', 'Blue': 'gems', 'Green': 'beasts'}
+
+WIN_TOWER = 50        # 塔高达到 50 获胜
+HAND_SIZE = 6
+MAX_TURNS = 2000      # 超过视为死循环 (与 JS 版一致)
+
+# "+N xxx" 中的单词 -> 状态字段
+_PLUS_STAT = {'tower': 'tower', 'wall': 'wall', 'quarry': 'quarries', 'magic': 'magic',
+              'dungeon': 'dungeon', 'recruits': 'beasts', 'beasts': 'beasts',
+              'bricks': 'bricks', 'gems': 'gems', 'gem': 'gems'}
+
+
+# ─── 效果编译 ──────────────────────────────────────────────────────────────────
+# 一个 op 是一个元组，side 为 'self' / 'opp':
+#   ('damage', side, n)             先扣墙，溢出部分扣塔 (dealDmgToOpp / dealDmgToSelf)
+#   ('tower_damage', side, n)       直接扣塔，最低 0
+#   ('wall_damage', side, n)        直接扣墙，最低 0
+#   ('gain', side, stat, n)         stat += n
+#   ('lose', side, stat, n, floor)  stat = max(floor, stat - n)
+#   ('raise_to_enemy', stat)        己方 stat 低于对手时追平
+#   ('equalize_max', stat)          双方 stat 都变为较高者
+#   ('swap', stat)                  交换双方 stat
+#   ('steal_half', stat, n)         对手失去最多 n 点，己方获得实际失去量的一半 (向上取整)
+#   ('if', cond, then_ops, else_ops)
+#       cond = ((side, stat), cmp, rhs)，rhs 为整数或 (side, stat)，cmp 为 '<' '>' '=='
+# 编译顺序与 simulate.js 中 applyEffect 的执行顺序一一对应，
+# 只依赖文本的判断在编译期完成，依赖对局状态的判断编译为 'if' op。
+
+def compile_effect(effect: str) -> list:
+    """把一条效果文本编译为 op 列表，语义与 simulate.js 的 applyEffect 一致。"""
+    e = effect.lower()
+    ops = []
+
+    def first_damage():
+        m = re.search(r'(\d+) damage', e)
+        return int(m.group(1)) if m else 0
+
+    # ── 伤害 ──
+    tower_dmg = re.search(r'(\d+) damage to (?:enemy )?tower', e)
+    if tower_dmg:
+        ops.append(('tower_damage', 'opp', int(tower_dmg.group(1))))
+
+    self_tower_dmg = re.search(r'(\d+) damage to (?:your )?tower', e)
+    if self_tower_dmg and 'damage to enemy tower' not in e:
+        ops.append(('tower_damage', 'self', int(self_tower_dmg.group(1))))
+
+    if not tower_dmg and not self_tower_dmg:
+        v = first_damage()
+        if v:
+            ops.append(('damage', 'opp', v))
+    elif tower_dmg:
+        tv = int(tower_dmg.group(1))
+        for m in re.finditer(r'(\d+) damage', e):
+            if int(m.group(1)) != tv:
+                ops.append(('damage', 'opp', int(m.group(1))))
+
+    if 'damage to all towers' in e or 'damage to all enemies' in e:
+        v = first_damage()
+        if v:
+            ops += [('tower_damage', 'opp', v), ('tower_damage', 'self', v)]
+
+    if 'all walls take' in e:
+        v = first_damage()
+        if v:
+            ops += [('wall_damage', 'self', v), ('wall_damage', 'opp', v)]
+
+    m = re.search(r'you take (\d+) damage', e)
+    if m:
+        ops.append(('damage', 'self', int(m.group(1))))
+
+    # ── 增益 ──
+    for m in re.finditer(r'\+(\d+) (\w+)', e):
+        stat = _PLUS_STAT.get(m.group(2))
+        if stat:
+            ops.append(('gain', 'self', stat, int(m.group(1))))
+
+    m = re.search(r'\+(\d+) enemy tower', e)
+    if m:
+        ops.append(('gain', 'opp', 'tower', int(m.group(1))))
+
+    if "+1 to all player's quarry" in e:
+        ops += [('gain', 'self', 'quarries', 1), ('gain', 'opp', 'quarries', 1)]
+    if "+1 to all player's dungeon" in e:
+        ops += [('gain', 'self', 'dungeon', 1), ('gain', 'opp', 'dungeon', 1)]
+
+    for word, stat in (('gems', 'gems'), ('bricks', 'bricks'), ('recruits', 'beasts')):
+        m = re.search(rf'(?:you gain|gain) (\d+) {word}', e)
+        if m:
+            ops.append(('gain', 'self', stat, int(m.group(1))))
+
+    # ── 资源损失 ──
+    self_lose = {}
+    for word, stat in (('gems', 'gems'), ('bricks', 'bricks'), ('recruits', 'beasts')):
+        self_lose[word] = re.search(rf'you lose (\d+) {word}', e)
+        if self_lose[word]:
+            ops.append(('lose', 'self', stat, int(self_lose[word].group(1)), 0))
+    for word, stat in (('bricks', 'bricks'), ('recruits', 'beasts')):
+        m = re.search(rf'lose (\d+) {word}', e)
+        if m and not self_lose[word]:
+            ops.append(('lose', 'self', stat, int(m.group(1)), 0))
+
+    for word, stat in (('bricks', 'bricks'), ('gems', 'gems'), ('recruits', 'beasts')):
+        m = re.search(rf'enemy loses (\d+) {word}', e)
+        if m:
+            ops.append(('lose', 'opp', stat, int(m.group(1)), 0))
+    if '-1 enemy dungeon' in e:
+        ops.append(('lose', 'opp', 'dungeon', 1, 1))
+
+    if 'all players lose' in e:
+        m = re.search(r'all players lose (\d+) (\w+)', e)
+        stat = {'bricks': 'bricks', 'gems': 'gems', 'recruits': 'beasts'}.get(m.group(2)) if m else None
+        if stat:
+            v = int(m.group(1))
+            ops += [('lose', 'self', stat, v, 0), ('lose', 'opp', stat, v, 0)]
+        if 'bricks, gems' in e:
+            m = re.search(r'lose (\d+) bricks', e)
+            if m:
+                v = int(m.group(1))
+                ops += [('lose', side, stat, v, 0) for side in ('self', 'opp')
+                        for stat in ('bricks', 'gems', 'beasts')]
+
+    # ── 产能削减 (最低 1) ──
+    if (re.search(r'-1 quarry(?!\s*[\.,]?\s*\+)', e)
+            and 'enemy quarry' not in e and 'all player' not in e):
+        ops.append(('lose', 'self', 'quarries', 1, 1))
+    if "-1 to all player's quarry" in e:
+        ops += [('lose', 'self', 'quarries', 1, 1), ('lose', 'opp', 'quarries', 1, 1)]
+    if '-1 enemy quarry' in e:
+        ops.append(('lose', 'opp', 'quarries', 1, 1))
+
+    if '-1 magic' in e and 'all player' not in e:
+        ops.append(('lose', 'self', 'magic', 1, 1))
+    if "all player's magic -1" in e or ('all player' in e and 'magic -1' in e):
+        ops += [('lose', 'self', 'magic', 1, 1), ('lose', 'opp', 'magic', 1, 1)]
+
+    # ── 条件效果 ──
+    if 'if quarry < enemy quarry' in e and '+2 quarry' in e:
+        ops.append(('if', (('self', 'quarries'), '<', ('opp', 'quarries')),
+                    [('gain', 'self', 'quarries', 2)], [('gain', 'self', 'quarries', 1)]))
+    if 'quarry = enemy quarry' in e:
+        ops.append(('raise_to_enemy', 'quarries'))
+    if 'if wall = 0' in e:
+        ops.append(('if', (('self', 'wall'), '==', 0),
+                    [('gain', 'self', 'wall', 6)], [('gain', 'self', 'wall', 3)]))
+    if 'if tower < enemy tower' in e:
+        ops.append(('if', (('self', 'tower'), '<', ('opp', 'tower')),
+                    [('gain', 'self', 'tower', 2)], [('gain', 'self', 'tower', 1)]))
+    if 'if enemy wall = 0' in e:
+        ops.append(('if', (('opp', 'wall'), '==', 0),
+                    [('damage', 'opp', 10)], [('damage', 'opp', 6)]))
+    if 'if enemy wall > 0' in e:
+        ops.append(('if', (('opp', 'wall'), '>', 0),
+                    [('damage', 'opp', 10)], [('damage', 'opp', 7)]))
+    if 'if magic > enemy magic' in e:
+        ops.append(('if', (('self', 'magic'), '>', ('opp', 'magic')),
+                    [('damage', 'opp', 12)], [('damage', 'opp', 8)]))
+    if 'if wall > enemy wall' in e:
+        if 'damage to tower' not in e:
+            ops.append(('if', (('self', 'wall'), '>', ('opp', 'wall')),
+                        [('damage', 'opp', 3)], [('damage', 'opp', 2)]))
+        else:
+            ops.append(('if', (('self', 'wall'), '>', ('opp', 'wall')),
+                        [('tower_damage', 'opp', 6)], [('damage', 'opp', 6)]))
+    if 'if tower > enemy wall' in e:
+        ops.append(('if', (('self', 'tower'), '>', ('opp', 'wall')),
+                    [('tower_damage', 'opp', 8)], [('damage', 'opp', 8)]))
+    if 'switch your wall with enemy wall' in e:
+        ops.append(('swap', 'wall'))
+    if "all player's magic equals" in e:
+        ops.append(('equalize_max', 'magic'))
+    if 'you gain 1/2 amt' in e:
+        ops += [('steal_half', 'gems', 10), ('steal_half', 'bricks', 5)]
+
+    return ops
+
+
+# ─── op -> 闭包 ────────────────────────────────────────────────────────────────
+# 闭包签名统一为 f(sides)，sides = (己方状态, 对方状态)
+_SIDE = {'self': 0, 'opp': 1}
+_CMP = {'<': lambda a, b: a < b, '>': lambda a, b: a > b, '==': lambda a, b: a == b}
+
+
+def _bind_cond(cond):
+    (side, stat), cmp, rhs = cond
+    k, i, test = _SIDE[side], _STAT[stat], _CMP[cmp]
+    if isinstance(rhs, int):
+        return lambda sides: test(sides[k][i], rhs)
+    k2, i2 = _SIDE[rhs[0]], _STAT[rhs[1]]
+    return lambda sides: test(sides[k][i], sides[k2][i2])
+
+
+def bind_op(op):
+    """把单个 op 元组绑定为可直接执行的闭包。"""
+    kind = op[0]
+
+    if kind == 'damage':
+        k, n = _SIDE[op[1]], op[2]
+
+        def f(sides):
+            s = sides[k]
+            excess = n - s[WALL]
+            if excess > 0:
+                s[WALL] = 0
+                s[TOWER] = max(0, s[TOWER] - excess)
+            else:
+                s[WALL] -= n
+        return f
+
+    if kind == 'tower_damage' or kind == 'wall_damage':
+        k, i, n = _SIDE[op[1]], TOWER if kind == 'tower_damage' else WALL, op[2]
+
+        def f(sides):
+            s = sides[k]
+            s[i] = max(0, s[i] - n)
+        return f
+
+    if kind == 'gain':
+        k, i, n = _SIDE[op[1]], _STAT[op[2]], op[3]
+
+        def f(sides):
+            sides[k][i] += n
+        return f
+
+    if kind == 'lose':
+        k, i, n, floor = _SIDE[op[1]], _STAT[op[2]], op[3], op[4]
+
+        def f(sides):
+            s = sides[k]
+            s[i] = max(floor, s[i] - n)
+        return f
+
+    if kind == 'raise_to_enemy':
+        i = _STAT[op[1]]
+
+        def f(sides):
+            me, opp = sides
+            if me[i] < opp[i]:
+                me[i] = opp[i]
+        return f
+
+    if kind == 'equalize_max':
+        i = _STAT[op[1]]
+
+        def f(sides):
+            me, opp = sides
+            me[i] = opp[i] = max(me[i], opp[i])
+        return f
+
+    if kind == 'swap':
+        i = _STAT[op[1]]
+
+        def f(sides):
+            me, opp = sides
+            me[i], opp[i] = opp[i], me[i]
+        return f
+
+    if kind == 'steal_half':
+        i, n = _STAT[op[1]], op[2]
+
+        def f(sides):
+            me, opp = sides
+            taken = min(n, opp[i])
+            opp[i] = max(0, opp[i] - n)
+            me[i] += math.ceil(taken / 2)
+        return f
+
+    if kind == 'if':
+        test = _bind_cond(op[1])
+        then_fns = [bind_op(o) for o in op[2]]
+        else_fns = [bind_op(o) for o in op[3]]
+
+        def f(sides):
+            for g in (then_fns if test(sides) else else_fns):
+                g(sides)
+        return f
+
+    raise ValueError(f"unknown op: {op!r}")
+
+
+def card_program(card: dict) -> tuple:
+    """
+    卡牌的 (op 序列, 是否再来一回合)。card_ir 编译出的 IR 条目带 ops / play_again 字段时直接取用，
+    不再解析效果文本；各模拟器都经由这里取 op。
+    """
+    ops = card['ops'] if 'ops' in card else compile_effect(card.get('effect', ''))
+    play_again = card['play_again'] if 'play_again' in card else 'play again' in card.get('effect', '').lower()
+    return ops, play_again
+
+
+def compile_cards(cards: list) -> list:
+    """
+    编译整副卡组，返回与 cards 对齐的 (支付资源下标, 费用, 闭包元组, 是否再来一回合) 列表。
+    颜色未知的卡支付资源下标为 None，永远不可打出 (与 canAfford 一致)。
+    cards 可以是 card_ir 编译出的 IR 条目 (见 card_program)。
+    """
+    compiled = []
+    for card in cards:
+        resource = COLOR_RESOURCE.get(card.get('color'))
+        ops, play_again = card_program(card)
+        fns = tuple(bind_op(op) for op in ops)
+        compiled.append((_STAT[resource] if resource else None, card.get('cost', 0), fns, play_again))
+    return compiled
+
+
+def apply_card(compiled_card, me: list, opp: list) -> bool:
+    """对 (己方, 对方) 状态执行一张已编译卡的效果，返回是否再来一回合。"""
+    sides = (me, opp)
+    for f in compiled_card[2]:
+        f(sides)
+    return compiled_card[3]
+
+
+# ─── 对局循环 ──────────────────────────────────────────────────────────────────
+def new_deck(n_cards: int, rng: random.Random) -> list:
+    """每张卡两份并洗牌；牌堆从列表末尾摸牌。"""
+    deck = list(range(n_cards)) * 2
+    rng.shuffle(deck)
+    return deck
+
+
+def _assert_valid_state(state: list, label: str):
+    for i, v in enumerate(state):
+        if v < 0:
+            raise RuntimeError(f"{label} has negative {STATS[i]} ({v})")
+
+
+def run_simulation(compiled: list, rng: random.Random, log: list = None) -> dict:
+    """
+    模拟一局 (双方都打出手牌中第一张付得起的卡，否则弃掉第一张)，
+    返回 {'winner': 'PLAYER'|'ENEMY', 'turns': 回合数, 'dead_hands': 无牌可出次数}。
+    传入 log 列表时，每次出牌追加一条 (回合, 是否玩家, 卡牌下标, 付费前该颜色资源的存量)。
+    """
+    n_cards = len(compiled)
+    player = [INITIAL_STATE[k] for k in STATS]
+    enemy = [INITIAL_STATE[k] for k in STATS]
+    deck = new_deck(n_cards, rng)
+
+    def draw():
+        nonlocal deck
+        if not deck:
+            deck = new_deck(n_cards, rng)
+        return deck.pop()
+
+    player_hand, enemy_hand = [], []
+    for _ in range(HAND_SIZE):
+        player_hand.append(draw())
+        enemy_hand.append(draw())
+
+    is_player_turn = True
+    turns = 0
+    dead_hands = 0
+
+    while 0 < player[TOWER] < WIN_TOWER and 0 < enemy[TOWER] < WIN_TOWER:
+        turns += 1
+        if turns > MAX_TURNS:
+            raise RuntimeError('Game loop infinite')
+
+        if is_player_turn:
+            me, opp, hand = player, enemy, player_hand
+        else:
+            me, opp, hand = enemy, player, enemy_hand
+
+        # 资源产出
+        me[BRICKS] += me[QUARRIES]
+        me[GEMS] += me[MAGIC]
+        me[BEASTS] += me[DUNGEON]
+
+        play_again = False
+        for pos, c in enumerate(hand):
+            resource, cost = compiled[c][0], compiled[c][1]
+            if resource is not None and me[resource] >= cost:
+                if log is not None:
+                    log.append((turns, is_player_turn, c, me[resource]))
+                me[resource] -= cost
+                play_again = apply_card(compiled[c], me, opp)
+                break
+        else:
+            dead_hands += 1
+            pos = 0    # 无牌可出: 弃掉第一张
+        hand.pop(pos)
+        hand.append(draw())
+
+        _assert_valid_state(player, 'Player')
+        _assert_valid_state(enemy, 'Enemy')
+
+        if not play_again:
+            is_player_turn = not is_player_turn
+
+    winner = 'PLAYER' if (player[TOWER] >= WIN_TOWER or enemy[TOWER] <= 0) else 'ENEMY'
+    return {'winner': winner, 'turns': turns, 'dead_hands': dead_hands}
+
+
+TURN_BUCKETS = [('1-20', 20), ('21-40', 40), ('41-60', 60), ('61-80', 80), ('81-100', 100), ('100+', None)]
+
+
+def turn_bucket(turns: int) -> str:
+    for label, upper in TURN_BUCKETS:
+        if upper is None or turns <= upper:
+            return label
+
+
+# ─── 批量模拟 (多进程分片) ─────────────────────────────────────────────────────
+# count 局被切成固定大小的分片，第 k 个分片的种子只由 (主种子, k) 决定；
+# 分片统计量的合并满足交换律，因此同一主种子下结果与进程数、完成顺序无关。
+SHARD_SIZE = 500
+
+
+def shard_seed(master_seed: int, shard: int) -> int:
+    digest = hashlib.sha256(f'{master_seed}:{shard}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def new_tally(n_cards: int) -> dict:
+    return {
+        'games': 0, 'player_wins': 0, 'enemy_wins': 0,
+        'total_turns': 0, 'min_turns': None, 'max_turns': 0,
+        'turn_histogram': {},                  # 回合数 -> 局数
+        'total_dead_hands': 0, 'games_with_dead_hands': 0,
+        'card_plays': [0] * n_cards,           # 每张卡被打出的次数
+        'card_wins': [0] * n_cards,            # 其中由最终获胜方打出的次数
+    }
+
+
+def merge_tally(into: dict, part: dict) -> dict:
+    """把分片统计 part 合并进 into (原地修改并返回 into)。"""
+    for key in ('games', 'player_wins', 'enemy_wins', 'total_turns',
+                'total_dead_hands', 'games_with_dead_hands'):
+        into[key] += part[key]
+    if part['min_turns'] is not None:
+        into['min_turns'] = part['min_turns'] if into['min_turns'] is None \
+            else min(into['min_turns'], part['min_turns'])
+    into['max_turns'] = max(into['max_turns'], part['max_turns'])
+    for turns, cnt in part['turn_histogram'].items():
+        into['turn_histogram'][turns] = into['turn_histogram'].get(turns, 0) + cnt
+    for key in ('card_plays', 'card_wins'):
+        into[key] = [a + b for a, b in zip(into[key], part[key])]
+    return into
+
+
+def run_shard(compiled: list, master_seed: int, shard: int, games: int) -> dict:
+    """用分片种子连续模拟 games 局，返回该分片的统计。"""
+    rng = random.Random(shard_seed(master_seed, shard))
+    tally = new_tally(len(compiled))
+    plays, wins = tally['card_plays'], tally['card_wins']
+    hist = tally['turn_histogram']
+    log = []
+    for _ in range(games):
+        log.clear()
+        res = run_simulation(compiled, rng, log)
+        player_won = res['winner'] == 'PLAYER'
+        tally['games'] += 1
+        tally['player_wins' if player_won else 'enemy_wins'] += 1
+        turns = res['turns']
+        tally['total_turns'] += turns
+        if tally['min_turns'] is None or turns < tally['min_turns']:
+            tally['min_turns'] = turns
+        tally['max_turns'] = max(tally['max_turns'], turns)
+        hist[turns] = hist.get(turns, 0) + 1
+        if res['dead_hands'] > 0:
+            tally['total_dead_hands'] += res['dead_hands']
+            tally['games_with_dead_hands'] += 1
+        for _, by_player, c, _ in log:
+            plays[c] += 1
+            if by_player == player_won:
+                wins[c] += 1
+    return tally
+
+
+# 工作进程内的已编译卡组 (闭包不能跨进程传递，每个进程各自编译一次)
+_WORKER_COMPILED = None
+
+
+def _init_worker(cards: list):
+    global _WORKER_COMPILED
+    _WORKER_COMPILED = compile_cards(cards)
+
+
+def _run_shard_in_worker(args):
+    return run_shard(_WORKER_COMPILED, *args)
+
+
+def run_many(cards: list, count: int, seed: int = None, workers: int = 1,
+             shard_size: int = SHARD_SIZE, on_progress=None, on_shard=None) -> dict:
+    """
+    模拟 count 局并汇总胜负、回合长度分布、死手与卡牌出场统计 (对应 simulate.js 的 runMany)。
+    workers > 1 时各分片在进程池中运行，分片结果到达即合并，每次合并后调用 on_progress(tally)。
+    on_shard(part) 在每个分片合并前以该分片自己的统计调用，供流式消费者增量处理。
+    seed 为 None 时随机生成主种子，并记录在 tally['seed'] 中以便复现。
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    shards = [(seed, k, min(shard_size, count - start))
+              for k, start in enumerate(range(0, count, shard_size))]
+    tally = new_tally(len(cards))
+    tally['seed'] = seed
+
+    if workers <= 1 or len(shards) <= 1:
+        compiled = compile_cards(cards)
+        parts = (run_shard(compiled, *args) for args in shards)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(shards)),
+                                    initializer=_init_worker, initargs=(cards,))
+        parts = pool.imap_unordered(_run_shard_in_worker, shards)
+    try:
+        for part in parts:
+            if on_shard:
+                on_shard(part)
+            merge_tally(tally, part)
+            if on_progress:
+                on_progress(tally)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return tally
+
+
+def write_game_log(cards: list, count: int, f, seed: int = None, shard_size: int = SHARD_SIZE) -> int:
+    """
+    逐局模拟并向文本流 f 写 JSONL 对局日志 (每局一行)，返回主种子。
+    分片种子与 run_many 相同，同一主种子下对局与 run_many 完全一致。
+    每行: {"game": 序号, "winner": "PLAYER"|"ENEMY", "turns": 回合数,
+           "plays": [[回合, "P"|"E", 卡牌 id, 付费前该颜色资源的存量], ...]}
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    compiled = compile_cards(cards)
+    ids = [c['id'] for c in cards]
+    log = []
+    game = 0
+    for k, start in enumerate(range(0, count, shard_size)):
+        rng = random.Random(shard_seed(seed, k))
+        for _ in range(min(shard_size, count - start)):
+            log.clear()
+            res = run_simulation(compiled, rng, log)
+            plays = [[t, 'P' if by_player else 'E', ids[c], avail] for t, by_player, c, avail in log]
+            f.write(json.dumps({'game': game, 'winner': res['winner'], 'turns': res['turns'],
+                                'plays': plays}, separators=(',', ':')) + '\n')
+            game += 1
+    return seed
+
+
+def print_tally(tally: dict):
+    count = tally['games']
+    print(f"\n=== Results ({count} games) ===")
+    print(f"Player Wins : {tally['player_wins']}  ({tally['player_wins'] / count * 100:.1f}%)")
+    print(f"Enemy Wins  : {tally['enemy_wins']}  ({tally['enemy_wins'] / count * 100:.1f}%)")
+    print(f"\n--- Turn Length ---")
+    print(f"Average turns per game : {tally['total_turns'] / count:.1f}")
+    print(f"Shortest game          : {tally['min_turns']} turns")
+    print(f"Longest game           : {tally['max_turns']} turns")
+    print(f"\n--- Turn Distribution ---")
+    buckets = {label: 0 for label, _ in TURN_BUCKETS}
+    for turns, cnt in tally['turn_histogram'].items():
+        buckets[turn_bucket(turns)] += cnt
+    for label, cnt in buckets.items():
+        bar = '█' * round(cnt / count * 40)
+        print(f"  {label:<8} {cnt:>4} | {bar}")
+    print(f"\n--- Dead Hand Analysis ---")
+    print(f"Total 'Dead Hand' occurrences : {tally['total_dead_hands']}")
+    print(f"Games with ≥1 Dead Hand       : {tally['games_with_dead_hands']} / {count} "
+          f"({tally['games_with_dead_hands'] / count * 100:.2f}%)")
+
+
+def print_card_plays(tally: dict, cards: list, top_n: int = 10):
+    """按出场次数列出最常打出的卡，以及打出方最终获胜的比例。"""
+    played = [(n, w, c) for n, w, c in zip(tally['card_plays'], tally['card_wins'], cards) if n]
+    played.sort(key=lambda x: x[0], reverse=True)
+    print(f"\n--- Most Played Cards (top {top_n}) ---")
+    for n, w, c in played[:top_n]:
+        print(f"  {c['name']:<24} plays: {n:>7}  win% when played: {w / n * 100:5.1f}")
+
+
+def load_cards(path: Path = None) -> list:
+    path = path or Path(__file__).parent.parent / 'src' / 'cards.json'
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Citadel game simulator (Python port of simulate.js)')
+    ap.add_argument('count', nargs='?', type=int, default=1, help='number of games to simulate')
+    ap.add_argument('--seed', type=int, default=None, help='master seed for reproducible runs')
+    ap.add_argument('--workers', type=int, default=1,
+                    help='worker processes (results do not depend on this for a fixed seed)')
+    ap.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='games per shard')
+    ap.add_argument('--out', type=Path, default=None, help='write the merged tally as JSON')
+    ap.add_argument('--log', type=Path, default=None,
+                    help='write per-game JSONL logs to this path (.gz to compress) instead of the tally')
+    ap.add_argument('--ir', type=Path, default=None,
+                    help='run on a compiled card IR (tools/card_ir.py) instead of parsing cards.json')
+    args = ap.parse_args(argv)
+    if args.count <= 0:
+        ap.error('count must be a positive number of games')
+    if args.shard_size <= 0:
+        ap.error('--shard-size must be a positive number of games')
+    if args.workers < 1:
+        ap.error('--workers must be at least 1')
+
+    if args.ir:
+        from card_ir import CARDS_PATH, load_ir
+        try:
+            cards = load_ir(args.ir, CARDS_PATH)['cards']      # IR 落后于 cards.json 时拒绝运行
+        except (OSError, ValueError) as err:
+            ap.error(str(err))
+    else:
+        cards = load_cards()
+
+    if args.log:
+        opener = gzip.open if args.log.suffix == '.gz' else open
+        with opener(args.log, 'wt', encoding='utf-8') as f:
+            seed = write_game_log(cards, args.count, f, seed=args.seed, shard_size=args.shard_size)
+        print(f"[DONE] {args.count} game logs written to: {args.log} (master seed {seed})")
+        return
+
+    print(f"Running {args.count} simulated games...")
+
+    def progress(tally):
+        print(f"\r  {tally['games']}/{args.count} games", end='', file=sys.stderr, flush=True)
+
+    try:
+        tally = run_many(cards, args.count, seed=args.seed, workers=args.workers,
+                         shard_size=args.shard_size,
+                         on_progress=progress if args.workers > 1 else None)
+    except RuntimeError as err:
+        print(f"\nSimulation error: {err}")
+        sys.exit(1)
+    if args.workers > 1:
+        print(file=sys.stderr)
+    print(f"Master seed : {tally['seed']}")
+    print_tally(tally)
+    print_card_plays(tally, cards)
+
+    if args.out:
+        export = dict(tally, turn_histogram={str(k): v for k, v in sorted(tally['turn_histogram'].items())},
+                      card_ids=[c['id'] for c in cards])
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(export, f, ensure_ascii=False, indent=2)
+        print(f"\n[DONE] Tally exported to: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,562 @@
+"""
+Citadel Policy Tournament
+===========================
+让不同的出牌策略循环对战 (round-robin)，衡量更强打法下的平衡性。
+
+策略 (--policies，逗号分隔):
+  random     : 在付得起的卡中随机选择
+  greedy     : 选 CardScorer 净价值最高的付得起的卡
+  lookahead  : 一步前瞻，对每张候选卡执行效果后用局面评估函数打分；
+               Play again 的卡会继续向后展开，局面值缓存在置换表中
+  mcts       : 根节点 UCB1 的蒙特卡洛搜索，每步 --rollouts 次模拟；
+               对手手牌与牌堆在每次模拟前随机采样 (确定化)，模拟到 --depth 回合后用评估函数截断；
+               同一局面的根节点统计在一局之内缓存复用
+  first      : 与 simulate.js 相同，打出第一张付得起的卡
+
+每对策略在每种卡组 (全卡组及 --colors 指定的单色卡组) 上对战 --games 局，
+先后手交替。对局按分片在进程池中并行，分片种子只由 (主种子, 分片号) 决定，
+结果与进程数无关。输出每种卡组的胜率矩阵与 Elo (Bradley-Terry 极大似然，与对局顺序无关)。
+
+用法:
+  python tools/card_tournament.py --policies random,greedy,lookahead,mcts --games 200 --workers 4
+  python tools/card_tournament.py --policies greedy,mcts --rollouts 300 --colors Red,Blue,Green
+  python tools/card_tournament.py --ir tools/card_ir.json     # 直接使用预编译的 ops 与 signals
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+from pathlib import Path
+
+from card_simulator import (
+    TOWER, WALL, QUARRIES, BRICKS, MAGIC, GEMS, DUNGEON, BEASTS,
+    INITIAL_STATE, STATS, WIN_TOWER, HAND_SIZE, MAX_TURNS,
+    COLOR_RESOURCE, compile_cards, apply_card, shard_seed, load_cards,
+)
+
+# 强制 stdout 使用 UTF-8 (兼容 Windows GBK 终端)
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+ALL = 'All'
+TRANSPOSITION_SIZE = 200_000     # 置换表条目上限，满了整体清空
+
+
+# ─── 局面评估 ─────────────────────────────────────────────────────────────────
+WIN_SCORE = 1000.0
+
+
+def outcome(me: list, opp: list):
+    """对局已结束时返回 1 (me 胜) / 0 (me 负)，否则返回 None。判定顺序与 run_simulation 一致。"""
+    if me[TOWER] >= WIN_TOWER or opp[TOWER] <= 0:
+        return 1
+    if opp[TOWER] >= WIN_TOWER or me[TOWER] <= 0:
+        return 0
+    return None
+
+
+def evaluate(me: list, opp: list) -> float:
+    """从 me 的视角评估局面: 塔 > 墙 > 产能 > 库存资源。"""
+    done = outcome(me, opp)
+    if done is not None:
+        return WIN_SCORE if done else -WIN_SCORE
+    return ((me[TOWER] - opp[TOWER])
+            + 0.5 * (me[WALL] - opp[WALL])
+            + 3.0 * (me[QUARRIES] + me[MAGIC] + me[DUNGEON] - opp[QUARRIES] - opp[MAGIC] - opp[DUNGEON])
+            + 0.1 * (me[BRICKS] + me[GEMS] + me[BEASTS] - opp[BRICKS] - opp[GEMS] - opp[BEASTS]))
+
+
+def produce(state: list):
+    state[BRICKS] += state[QUARRIES]
+    state[GEMS] += state[MAGIC]
+    state[BEASTS] += state[DUNGEON]
+
+
+# ─── 策略 ─────────────────────────────────────────────────────────────────────
+class Policy:
+    """
+    choose() 从手牌中选出要打出的位置 (playable 为付得起的位置，非空)。
+    game 提供已编译卡组与卡池；rng 来自对局，保证可复现。
+    """
+    name = 'policy'
+
+    def new_game(self):
+        pass
+
+    def choose(self, game, me: list, opp: list, hand: list, playable: list, rng: random.Random) -> int:
+        raise NotImplementedError
+
+
+class FirstPolicy(Policy):
+    name = 'first'
+
+    def choose(self, game, me, opp, hand, playable, rng):
+        return playable[0]
+
+
+class RandomPolicy(Policy):
+    name = 'random'
+
+    def choose(self, game, me, opp, hand, playable, rng):
+        return rng.choice(playable)
+
+
+class GreedyPolicy(Policy):
+    name = 'greedy'
+
+    def choose(self, game, me, opp, hand, playable, rng):
+        net = game.net_values
+        return max(playable, key=lambda pos: net[hand[pos]])
+
+
+class LookaheadPolicy(Policy):
+    """
+    一步前瞻: 打出候选卡后的局面用 evaluate() 打分；若该卡带 Play again，
+    则在剩余手牌上继续展开 (最多 chain 层)。局面值只由 (双方状态, 剩余手牌, 剩余层数) 决定，
+    存入置换表跨回合、跨对局复用 (不同出牌顺序到达同一局面时直接命中)。
+    """
+    name = 'lookahead'
+
+    def __init__(self, chain: int = 2):
+        self.chain = chain
+        self.table = {}
+        self.hits = self.misses = 0
+
+    def choose(self, game, me, opp, hand, playable, rng):
+        best_pos, best_val = playable[0], -math.inf
+        for pos in playable:
+            rest = tuple(sorted(hand[:pos] + hand[pos + 1:]))
+            val = self._after(game, me, opp, hand[pos], rest, self.chain)
+            if val > best_val:
+                best_pos, best_val = pos, val
+        return best_pos
+
+    def _after(self, game, me, opp, card, rest, depth) -> float:
+        key = (tuple(me), tuple(opp), card, rest, depth)
+        val = self.table.get(key)
+        if val is not None:
+            self.hits += 1
+            return val
+        self.misses += 1
+        cc = game.compiled[card]
+        m, o = me[:], opp[:]
+        m[cc[0]] -= cc[1]
+        again = apply_card(cc, m, o)
+        val = evaluate(m, o)
+        if again and depth > 0 and outcome(m, o) is None:
+            produce(m)
+            follow = [self._after(game, m, o, c, rest[:i] + rest[i + 1:], depth - 1)
+                      for i, c in enumerate(rest)
+                      if (i == 0 or c != rest[i - 1]) and game.affordable(c, m)]
+            if follow:
+                val = max(follow)
+        if len(self.table) >= TRANSPOSITION_SIZE:
+            self.table.clear()
+        self.table[key] = val
+        return val
+
+
+class MCTSPolicy(Policy):
+    """
+    根节点 UCB1 蒙特卡洛搜索。每次模拟: 打出候选卡，对手手牌从卡池随机采样，
+    双方按"第一张付得起"的默认策略继续 depth 回合 (摸牌从卡池随机抽)，
+    到达终局取 0/1，否则取 evaluate() 经 logistic 压缩到 (0, 1)。
+    根节点统计按局面缓存 (置换表)，同一局内再次遇到相同局面时继续累积。
+    """
+    name = 'mcts'
+
+    def __init__(self, rollouts: int = 200, depth: int = 12, c: float = 1.4):
+        self.rollouts = rollouts
+        self.depth = depth
+        self.c = c
+        self.table = {}
+
+    def new_game(self):
+        # 统计依赖随机模拟，只在一局之内复用，保证结果与对局在哪个进程上运行无关
+        self.table.clear()
+
+    def choose(self, game, me, opp, hand, playable, rng):
+        # 手牌中同一张卡的多个副本是同一个走法
+        moves = {}
+        for pos in playable:
+            moves.setdefault(hand[pos], pos)
+        if len(moves) == 1:
+            return playable[0]
+        key = (tuple(me), tuple(opp), tuple(sorted(hand)))
+        stats = self.table.get(key)
+        if stats is None:
+            stats = {card: [0, 0.0] for card in moves}
+            if len(self.table) >= TRANSPOSITION_SIZE:
+                self.table.clear()
+            self.table[key] = stats
+        total = sum(n for n, _ in stats.values())
+        log = math.log
+        for _ in range(self.rollouts):
+            total += 1
+            card, best = None, -1.0
+            for cand, (n, w) in stats.items():
+                if n == 0:
+                    card = cand
+                    break
+                ucb = w / n + self.c * math.sqrt(log(total) / n)
+                if ucb > best:
+                    card, best = cand, ucb
+            rest = list(hand)
+            rest.remove(card)
+            value = self._rollout(game, me, opp, card, rest, rng)
+            s = stats[card]
+            s[0] += 1
+            s[1] += value
+        card = max(stats, key=lambda c: stats[c][0])
+        return moves[card]
+
+    def _rollout(self, game, me, opp, card, my_hand, rng) -> float:
+        # 热循环: 产出、胜负判定与抽牌都内联 (rng.choice 的开销约为整局的三成)
+        compiled, pool = game.compiled, game.pool
+        rand, n = rng.random, len(pool)
+        m, o = me[:], opp[:]
+        cc = compiled[card]
+        m[cc[0]] -= cc[1]
+        again = apply_card(cc, m, o)
+        hands = [my_hand + [pool[int(rand() * n)]], [pool[int(rand() * n)] for _ in range(HAND_SIZE)]]
+        states = [m, o]
+        side = 0 if again else 1
+        for _ in range(self.depth):
+            if not (0 < m[TOWER] < WIN_TOWER and 0 < o[TOWER] < WIN_TOWER):
+                break
+            s, t, hand = states[side], states[1 - side], hands[side]
+            s[BRICKS] += s[QUARRIES]
+            s[GEMS] += s[MAGIC]
+            s[BEASTS] += s[DUNGEON]
+            again = False
+            for pos, c in enumerate(hand):
+                cc = compiled[c]
+                if cc[0] is not None and s[cc[0]] >= cc[1]:
+                    s[cc[0]] -= cc[1]
+                    again = apply_card(cc, s, t)
+                    break
+            else:
+                pos = 0
+            hand[pos] = pool[int(rand() * n)]
+            if not again:
+                side = 1 - side
+        done = outcome(m, o)
+        if done is not None:
+            return float(done)
+        return 1.0 / (1.0 + math.exp(-evaluate(m, o) / 10.0))
+
+
+POLICIES = {
+    'first': FirstPolicy,
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'lookahead': LookaheadPolicy,
+    'mcts': MCTSPolicy,
+}
+
+
+def make_policy(name: str, rollouts: int = 200, depth: int = 12) -> Policy:
+    if name not in POLICIES:
+        raise ValueError(f"unknown policy '{name}' (choose from: {', '.join(POLICIES)})")
+    if name == 'mcts':
+        return MCTSPolicy(rollouts, depth)
+    return POLICIES[name]()
+
+
+# ─── 对局 ─────────────────────────────────────────────────────────────────────
+class Game:
+    """一副 (可按颜色限定的) 卡组的对局环境: 已编译卡牌、净价值与卡池。"""
+
+    def __init__(self, cards: list, compiled: list, net_values: list, color: str = ALL):
+        self.compiled = compiled
+        self.net_values = net_values
+        self.pool = [i for i, c in enumerate(cards) if color == ALL or c.get('color') == color]
+        if len(self.pool) * 2 < 2 * HAND_SIZE:
+            raise ValueError(f"{color} deck is too small for two {HAND_SIZE}-card hands")
+
+    def affordable(self, card: int, state: list) -> bool:
+        cc = self.compiled[card]
+        return cc[0] is not None and state[cc[0]] >= cc[1]
+
+    def new_deck(self, rng: random.Random) -> list:
+        deck = self.pool * 2
+        rng.shuffle(deck)
+        return deck
+
+    def play(self, policies: tuple, rng: random.Random) -> dict:
+        """
+        policies[0] 先手。返回 {'winner': 0 | 1 | None (超过 MAX_TURNS 判和), 'turns': 回合数}。
+        规则与 card_simulator.run_simulation 相同，只是出哪张卡由策略决定。
+        """
+        for p in policies:
+            p.new_game()
+        states = ([INITIAL_STATE[k] for k in STATS], [INITIAL_STATE[k] for k in STATS])
+        deck = self.new_deck(rng)
+
+        def draw():
+            nonlocal deck
+            if not deck:
+                deck = self.new_deck(rng)
+            return deck.pop()
+
+        hands = ([], [])
+        for _ in range(HAND_SIZE):
+            hands[0].append(draw())
+            hands[1].append(draw())
+
+        side, turns = 0, 0
+        while outcome(states[0], states[1]) is None:
+            turns += 1
+            if turns > MAX_TURNS:
+                return {'winner': None, 'turns': turns - 1}
+            me, opp, hand = states[side], states[1 - side], hands[side]
+            produce(me)
+            playable = [pos for pos, c in enumerate(hand) if self.affordable(c, me)]
+            again = False
+            if playable:
+                pos = policies[side].choose(self, me, opp, hand, playable, rng)
+                cc = self.compiled[hand[pos]]
+                me[cc[0]] -= cc[1]
+                again = apply_card(cc, me, opp)
+            else:
+                pos = 0    # 无牌可出: 弃掉第一张
+            hand.pop(pos)
+            hand.append(draw())
+            if not again:
+                side = 1 - side
+        return {'winner': 1 - outcome(states[0], states[1]), 'turns': turns}
+
+
+# ─── 循环赛 (多进程分片) ───────────────────────────────────────────────────────
+SHARD_SIZE = 20
+
+
+def new_record() -> dict:
+    return {'games': 0, 'wins': 0, 'losses': 0, 'draws': 0, 'turns': 0}
+
+
+def run_shard(cards: list, compiled: list, net_values: list, policies: dict,
+              master_seed: int, shard: int, pairing: tuple, games: int, offset: int) -> dict:
+    """
+    pairing = (策略 A, 策略 B, 卡组颜色)。第 offset + k 局中 k 为偶数时 A 先手。
+    返回 {pairing: A 视角的战绩}。
+    """
+    a, b, color = pairing
+    game = Game(cards, compiled, net_values, color)
+    rng = random.Random(shard_seed(master_seed, shard))
+    rec = new_record()
+    for k in range(offset, offset + games):
+        a_first = k % 2 == 0
+        order = (policies[a], policies[b]) if a_first else (policies[b], policies[a])
+        res = game.play(order, rng)
+        rec['games'] += 1
+        rec['turns'] += res['turns']
+        if res['winner'] is None:
+            rec['draws'] += 1
+        elif (res['winner'] == 0) == a_first:
+            rec['wins'] += 1
+        else:
+            rec['losses'] += 1
+    return {pairing: rec}
+
+
+# 工作进程内的卡组与策略实例 (置换表在同一进程的分片之间共享)
+_WORKER = {}
+
+
+def _init_worker(cards: list, names: list, rollouts: int, depth: int):
+    from card_power_analyzer import CardScorer
+    scorer = CardScorer()
+    _WORKER['cards'] = cards
+    _WORKER['compiled'] = compile_cards(cards)
+    _WORKER['net'] = [scorer.score(c)['net_value'] for c in cards]
+    _WORKER['policies'] = {name: make_policy(name, rollouts, depth) for name in names}
+
+
+def _run_shard_in_worker(args):
+    return run_shard(_WORKER['cards'], _WORKER['compiled'], _WORKER['net'], _WORKER['policies'], *args)
+
+
+def run_tournament(cards: list, names: list, games: int, colors: list = (ALL,), seed: int = None,
+                   workers: int = 1, rollouts: int = 200, depth: int = 12,
+                   shard_size: int = SHARD_SIZE, on_progress=None) -> dict:
+    """
+    names 中每对策略在 colors 中每种卡组上各对战 games 局。
+    返回 {'seed', 'records': {(A, B, 颜色): A 视角战绩}}。
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+    for name in names:
+        make_policy(name)
+    pairings = [(a, b, color) for color in colors
+                for i, a in enumerate(names) for b in names[i + 1:]]
+    shards = []
+    for pairing in pairings:
+        for offset in range(0, games, shard_size):
+            shards.append((seed, len(shards), pairing, min(shard_size, games - offset), offset))
+
+    records = {p: new_record() for p in pairings}
+    init_args = (cards, list(names), rollouts, depth)
+    if workers <= 1 or len(shards) <= 1:
+        _init_worker(*init_args)
+        parts = map(_run_shard_in_worker, shards)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(shards)), initializer=_init_worker, initargs=init_args)
+        parts = pool.imap_unordered(_run_shard_in_worker, shards)
+    done = 0
+    try:
+        for part in parts:
+            for pairing, rec in part.items():
+                for key, val in rec.items():
+                    records[pairing][key] += val
+                done += rec['games']
+            if on_progress:
+                on_progress(done, len(pairings) * games)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return {'seed': seed, 'records': records}
+
+
+# ─── 评分表 ───────────────────────────────────────────────────────────────────
+def elo_ratings(names: list, records: dict, color: str, iterations: int = 200) -> dict:
+    """
+    Bradley-Terry 极大似然 (平局记半胜)，换算为 Elo 标度并使平均分为 1500。
+    使用 MM 迭代，结果与对局顺序无关。每个策略加一局对虚拟平均对手的平局作为先验，避免全胜时发散。
+    """
+    wins = {n: 0.5 for n in names}
+    games = {(a, b): 0 for a in names for b in names}
+    for (a, b, col), rec in records.items():
+        if col != color:
+            continue
+        wins[a] += rec['wins'] + rec['draws'] / 2
+        wins[b] += rec['losses'] + rec['draws'] / 2
+        games[a, b] += rec['games']
+        games[b, a] += rec['games']
+    strength = {n: 1.0 for n in names}
+    for _ in range(iterations):
+        new = {}
+        for i in names:
+            denom = 1.0 / (strength[i] + 1.0)      # 先验: 与强度为 1 的虚拟对手一局
+            denom += sum(games[i, j] / (strength[i] + strength[j]) for j in names if j != i)
+            new[i] = wins[i] / denom
+        mean = math.exp(sum(math.log(v) for v in new.values()) / len(new))
+        strength = {n: v / mean for n, v in new.items()}
+    return {n: 1500 + 400 * math.log10(strength[n]) for n in names}
+
+
+def standings(names: list, records: dict, color: str) -> list:
+    """每个策略在该卡组上的汇总: 对局数、胜/负/和、胜率、Elo。"""
+    elo = elo_ratings(names, records, color)
+    rows = []
+    for n in names:
+        tot = new_record()
+        for (a, b, col), rec in records.items():
+            if col != color or n not in (a, b):
+                continue
+            mine = rec if n == a else dict(rec, wins=rec['losses'], losses=rec['wins'])
+            for key in tot:
+                tot[key] += mine[key]
+        rate = (tot['wins'] + tot['draws'] / 2) / tot['games'] if tot['games'] else 0.0
+        rows.append(dict(policy=n, win_rate=rate, elo=elo[n], **tot))
+    rows.sort(key=lambda r: r['elo'], reverse=True)
+    return rows
+
+
+def print_tables(names: list, result: dict, colors: list):
+    records = result['records']
+    for color in colors:
+        print(f"\n{'='*70}")
+        print(f"  [{color.upper()}] deck  (seed {result['seed']})")
+        print(f"{'='*70}")
+        print(f"  {'Policy':<10} {'Elo':>6} {'Win%':>7} {'Games':>6} {'W':>5} {'L':>5} {'D':>4}")
+        print(f"  {'-'*48}")
+        for r in standings(names, records, color):
+            print(f"  {r['policy']:<10} {r['elo']:>6.0f} {r['win_rate']:>7.1%} {r['games']:>6} "
+                  f"{r['wins']:>5} {r['losses']:>5} {r['draws']:>4}")
+        # 胜率矩阵: 行策略对列策略的胜率
+        print(f"\n  Row vs column win rate:")
+        print("  " + " " * 10 + "".join(f"{n:>11}" for n in names))
+        for a in names:
+            cells = []
+            for b in names:
+                rec = records.get((a, b, color))
+                flip = rec is None
+                rec = rec or records.get((b, a, color))
+                if rec is None or not rec['games']:
+                    cells.append(f"{'-':>11}")
+                    continue
+                w = rec['losses'] if flip else rec['wins']
+                cells.append(f"{(w + rec['draws'] / 2) / rec['games']:>11.1%}")
+            print(f"  {a:<10}" + "".join(cells))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Round-robin tournament between card-play policies')
+    ap.add_argument('--policies', default='random,greedy,lookahead,mcts',
+                    help=f"comma-separated policies ({', '.join(POLICIES)})")
+    ap.add_argument('--games', type=int, default=100, help='games per pairing per deck')
+    ap.add_argument('--colors', default='',
+                    help='also play color-limited decks, e.g. Red,Blue,Green (the full deck is always played)')
+    ap.add_argument('--rollouts', type=int, default=200, help='MCTS rollouts per move')
+    ap.add_argument('--depth', type=int, default=12, help='MCTS rollout depth in turns')
+    ap.add_argument('--seed', type=int, default=None, help='master seed for reproducible runs')
+    ap.add_argument('--workers', type=int, default=1, help='worker processes')
+    ap.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='games per shard')
+    ap.add_argument('--out', type=Path, default=None, help='write standings and records as JSON')
+    ap.add_argument('--ir', type=Path, default=None,
+                    help='play with a compiled card IR (tools/card_ir.py) instead of parsing cards.json')
+    args = ap.parse_args(argv)
+
+    names = [n.strip() for n in args.policies.split(',') if n.strip()]
+    if len(names) < 2:
+        ap.error('need at least two policies')
+    if args.games < 1:
+        ap.error('--games must be at least 1')
+    if args.shard_size < 1:
+        ap.error('--shard-size must be at least 1')
+    colors = [ALL] + [c.strip().title() for c in args.colors.split(',') if c.strip()]
+    unknown = [c for c in colors[1:] if c not in COLOR_RESOURCE]
+    if unknown:
+        ap.error(f"unknown color(s) {', '.join(unknown)}; choose from {', '.join(COLOR_RESOURCE)}")
+    if args.ir:
+        from card_ir import CARDS_PATH, load_ir
+        try:
+            cards = load_ir(args.ir, CARDS_PATH)['cards']      # IR 落后于 cards.json 时拒绝运行
+        except (OSError, ValueError) as err:
+            ap.error(str(err))
+    else:
+        cards = load_cards()
+    print(f"Tournament: {', '.join(names)} | decks: {', '.join(colors)} | {args.games} games per pairing")
+
+    def progress(done, total):
+        print(f"\r  {done}/{total} games", end='', file=sys.stderr, flush=True)
+
+    try:
+        result = run_tournament(cards, names, args.games, colors, seed=args.seed, workers=args.workers,
+                                rollouts=args.rollouts, depth=args.depth, shard_size=args.shard_size,
+                                on_progress=progress)
+    except ValueError as err:
+        print(f"\n[ERROR] {err}")
+        sys.exit(1)
+    print(file=sys.stderr)
+    print_tables(names, result, colors)
+
+    if args.out:
+        export = {
+            'seed': result['seed'],
+            'policies': names,
+            'standings': {color: standings(names, result['records'], color) for color in colors},
+            'records': [dict(a=a, b=b, color=color, **rec) for (a, b, color), rec in result['records'].items()],
+        }
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(export, f, ensure_ascii=False, indent=2)
+        print(f"\n[DONE] Tournament results exported to: {args.out}")
+
+
+if __name__ == '__main__':
+    main()